@@ -0,0 +1,164 @@
+"""Concurrent load benchmark for the smart_attendance.py storage path.
+
+Simulates N sessions, each a thread running a weighted mix of logins,
+check-ins and report queries against a temporary attendance.db, and
+reports throughput, p50/p95/p99 latency per operation and write-lock
+waits. Use --json to save a run and compare it across commits.
+
+Usage:
+    python benchmarks/attendance_load.py --sessions 16 --duration 10 \\
+        --mix login=1,checkin=8,report=1 --json load.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import smart_attendance as sa  # noqa: E402
+
+EVENTS = [f"Lecture {i}" for i in range(20)]
+PASSWORD = "benchmark"
+
+def parse_mix(text):
+    """Parse 'login=1,checkin=8,report=1' into a dict of weights."""
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {op!r}; choose from {', '.join(OPERATIONS)}")
+        mix[op] = float(weight or 1)
+    return mix
+
+def op_login(rng, users):
+    assert sa.authenticate(rng.choice(users), PASSWORD)
+
+def op_checkin(rng, users):
+    sa.mark_attendance(f"attendee {rng.randrange(100000)}", rng.choice(EVENTS))
+
+def op_report(rng, users):
+    event = rng.choice(EVENTS)
+    sa.get_attendance_page(event=event)
+    sa.get_daily_counts(event=event)
+
+OPERATIONS = {"login": op_login, "checkin": op_checkin, "report": op_report}
+
+def seed(users, rows):
+    """Create benchmark users and pre-existing attendance history."""
+    sa.init_db()
+    with sa.get_store().transaction() as conn:
+        conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                         ((user, sa.hash_password(PASSWORD)) for user in users))
+    start = datetime.datetime.now() - datetime.timedelta(days=365)
+    rng = random.Random(0)
+    sa.mark_attendance_many(
+        (f"attendee {rng.randrange(100000)}", rng.choice(EVENTS),
+         (start + datetime.timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"))
+        for _ in range(rows))
+
+def session(index, mix, deadline, think, samples, errors):
+    rng = random.Random(index)
+    ops, weights = zip(*mix.items())
+    users = [f"user{i}" for i in range(10)]
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        started = time.perf_counter()
+        try:
+            OPERATIONS[op](rng, users)
+        except (sqlite3.Error, AssertionError) as e:
+            errors.append((op, repr(e)))
+            continue
+        samples.append((op, time.perf_counter() - started))
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(samples, errors, elapsed):
+    results = {}
+    for op in sorted({op for op, _ in samples} | {op for op, _ in errors}):
+        latencies = sorted(seconds for name, seconds in samples if name == op)
+        results[op] = {
+            "count": len(latencies),
+            "errors": sum(1 for name, _ in errors if name == op),
+            "throughput_per_s": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("login=1,checkin=8,report=1"),
+                        help="Operation weights, e.g. login=1,checkin=8,report=1")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between operations (s)")
+    parser.add_argument("--seed-rows", type=int, default=100000, help="Attendance rows loaded before the run")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the query cache for report queries")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sa.DB_PATH = os.path.join(workdir, "attendance.db")
+        store = sa.get_store()
+        if args.no_cache:
+            store.cache.maxsize = 0
+        seed([f"user{i}" for i in range(10)], args.seed_rows)
+        store.lock_waits, store.lock_wait_seconds = 0, 0.0
+
+        samples, errors = [], []
+        deadline = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=session, args=(i, args.mix, deadline, args.think, samples, errors))
+                   for i in range(args.sessions)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        results = {
+            "commit": git_commit(),
+            "config": {"sessions": args.sessions, "duration": args.duration, "mix": args.mix,
+                       "think": args.think, "seed_rows": args.seed_rows, "cache": not args.no_cache},
+            "elapsed_s": elapsed,
+            "total_ops": len(samples),
+            "throughput_per_s": len(samples) / elapsed,
+            "operations": summarize(samples, errors, elapsed),
+            "lock_waits": store.lock_waits,
+            "lock_wait_ms": store.lock_wait_seconds * 1000,
+            "connections_opened": store.opened,
+            "cache": store.cache.stats(),
+            "sample_errors": errors[:5],
+        }
+        store.close()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cold-start benchmark for smart_attendance.py.
+
+Measures, each in a fresh interpreter:
+  * import latency of the module, and which heavy engines the import pulled in
+  * first-render latency of the login page via Streamlit's AppTest harness
+
+Usage:
+    python benchmarks/attendance_startup.py [--runs 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "matplotlib", "speech_recognition", "pyttsx3"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import smart_attendance
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+RENDER_PROBE = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(%r, default_timeout=60)
+app.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "exceptions": [str(e.value) for e in app.exception]}))
+""" % (os.path.join(ROOT, "smart_attendance.py"),)
+
+def run_probe(code, workdir):
+    """Run a probe in a fresh interpreter and return its JSON result."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summarize(samples):
+    seconds = [sample["seconds"] for sample in samples]
+    return {"runs": len(seconds), "median_ms": statistics.median(seconds) * 1000,
+            "min_ms": min(seconds) * 1000, "max_ms": max(seconds) * 1000}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--skip-render", action="store_true", help="Only measure import latency")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    # Work in a scratch directory so the app's attendance.db never touches the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        imports = [run_probe(IMPORT_PROBE, workdir) for _ in range(args.runs)]
+        results = {"import": summarize(imports), "heavy_modules_loaded": imports[-1]["loaded"]}
+        if not args.skip_render:
+            renders = [run_probe(RENDER_PROBE, workdir) for _ in range(args.runs)]
+            results["first_render"] = summarize(renders)
+            results["first_render"]["exceptions"] = renders[-1]["exceptions"]
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
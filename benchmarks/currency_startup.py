@@ -0,0 +1,134 @@
+"""Cold-start benchmark for currency_converter.py.
+
+Measures, each in a fresh interpreter:
+  * import latency of the module, and whether it pulled in matplotlib
+  * first-paint latency of the Tk window (construct the app, process one
+    round of pending events) with and without a reachable rate API, and
+    with or without rates saved by a previous session
+
+The "online" scenario points CURRENCY_API_URL at a local stand-in server so
+results do not depend on the public API; "offline" points it at a refused
+port. First paint needs a display and is skipped when none is available.
+
+Usage:
+    python benchmarks/currency_startup.py [--runs 5] [--json results.json]
+"""
+import argparse
+import http.server
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["matplotlib", "numpy", "requests"]
+OFFLINE_URL = "http://127.0.0.1:9/{base}"
+SAMPLE_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 149.5, "CAD": 1.36,
+                "AUD": 1.52, "CHF": 0.88, "CNY": 7.24, "SEK": 10.6, "NZD": 1.66}
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import currency_converter
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+PAINT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+import currency_converter
+root = tk.Tk()
+app = currency_converter.EnhancedCurrencyConverter(root)
+root.update()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "currencies": len(app.currencies),
+                  "matplotlib_loaded": "matplotlib" in sys.modules}))
+app.close()
+"""
+
+class RatesHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"base": "USD", "rates": SAMPLE_RATES}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def run_probe(code, workdir, api_url=OFFLINE_URL):
+    """Run a probe in a fresh interpreter and return its JSON result."""
+    env = dict(os.environ, PYTHONPATH=ROOT, CURRENCY_API_URL=api_url)
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summarize(samples):
+    seconds = [sample["seconds"] for sample in samples]
+    return {"runs": len(seconds), "median_ms": statistics.median(seconds) * 1000,
+            "min_ms": min(seconds) * 1000, "max_ms": max(seconds) * 1000}
+
+def has_display():
+    probe = "import tkinter; tkinter.Tk().destroy()"
+    return subprocess.run([sys.executable, "-c", probe], capture_output=True).returncode == 0
+
+def seed_saved_rates(workdir):
+    with open(os.path.join(workdir, "rates.json"), "w") as f:
+        json.dump({"base": "USD", "rates": SAMPLE_RATES, "fetched_at": 0}, f)
+
+def clear_saved_rates(workdir):
+    path = os.path.join(workdir, "rates.json")
+    if os.path.exists(path):
+        os.remove(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--skip-paint", action="store_true", help="Only measure import latency")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RatesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    online_url = "http://127.0.0.1:%d/{base}" % server.server_address[1]
+
+    # Work in a scratch directory so saved rates, history and alerts never touch the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        imports = [run_probe(IMPORT_PROBE, workdir) for _ in range(args.runs)]
+        results = {"import": summarize(imports), "heavy_modules_loaded": imports[-1]["loaded"]}
+        if args.skip_paint:
+            pass
+        elif not has_display():
+            results["first_paint"] = "skipped: no display"
+        else:
+            results["first_paint"] = {}
+            for network, api_url in (("online", online_url), ("offline", OFFLINE_URL)):
+                for saved in (False, True):
+                    samples = []
+                    for _ in range(args.runs):
+                        if saved:
+                            seed_saved_rates(workdir)
+                        else:
+                            clear_saved_rates(workdir)
+                        samples.append(run_probe(PAINT_PROBE, workdir, api_url))
+                    summary = summarize(samples)
+                    summary["currencies"] = samples[-1]["currencies"]
+                    summary["matplotlib_loaded"] = samples[-1]["matplotlib_loaded"]
+                    key = "%s_%s" % (network, "saved_rates" if saved else "cold")
+                    results["first_paint"][key] = summary
+    server.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
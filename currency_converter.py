@@ -1,12 +1,599 @@
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 import requests
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import random
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
+import argparse
+import csv
+import itertools
+import logging
+import math
+import queue
+import sys
+import threading
+import time
 import json
 
+logger = logging.getLogger(__name__)
+
+API_URL = os.environ.get("CURRENCY_API_URL", "https://api.exchangerate-api.com/v4/latest/{base}")
+SAVED_RATES = "rates.json"
+DEFAULT_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "SEK", "NZD"]
+
+
+class RateFetcher:
+    # Keep-alive HTTP session with connect/read timeouts and retries with
+    # exponential backoff on connection errors and 429/5xx responses.
+    def __init__(self, api_url=API_URL, timeout=(3.05, 10), retries=3, backoff=0.5):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __call__(self, base):
+        response = self.session.get(self.api_url.format(base=base), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['rates']
+
+    def close(self):
+        self.session.close()
+
+
+class RateSnapshot:
+    def __init__(self, base, rates, fetched_at=None):
+        self.base = base
+        self.rates = rates
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def cross_rate(self, from_curr, to_curr):
+        # Triangulate through the base: both rates are quoted per 1 base unit
+        return self.rates[to_curr] / self.rates[from_curr]
+
+
+class RateCache:
+    # Holds one rate table per base currency for ttl seconds; any pair is
+    # triangulated from the default base table, so conversions between
+    # arbitrary currencies need no extra network calls. At most max_bases
+    # tables are kept, least recently used first out.
+    def __init__(self, fetcher=None, ttl=600, max_bases=4, base="USD"):
+        self.fetcher = fetcher or RateFetcher()
+        self.ttl = ttl
+        self.max_bases = max_bases
+        self.base = base
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Called with every freshly fetched snapshot (from the fetching thread);
+        # a failing listener is logged and never fails the fetch itself
+        self.listeners = []
+
+    def cached(self, base=None):
+        with self._lock:
+            snapshot = self._snapshots.get(base or self.base)
+            if snapshot is not None and snapshot.age() < self.ttl:
+                return snapshot
+            return None
+
+    def snapshot(self, base=None):
+        base = base or self.base
+        with self._lock:
+            snapshot = self._snapshots.get(base)
+            if snapshot is not None and snapshot.age() < self.ttl:
+                self._snapshots.move_to_end(base)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        snapshot = RateSnapshot(base, self.fetcher(base))
+        self.store(snapshot)
+        return snapshot
+
+    def snapshot_async(self, executor, base=None):
+        # Returns a Future; concurrent requests for the same base share one fetch
+        base = base or self.base
+        with self._lock:
+            snapshot = self._snapshots.get(base)
+            if snapshot is not None and snapshot.age() < self.ttl:
+                self._snapshots.move_to_end(base)
+                self.hits += 1
+                future = Future()
+                future.set_result(snapshot)
+                return future
+            self.misses += 1
+            future = self._inflight.get(base)
+            if future is None:
+                future = executor.submit(self._fetch, base)
+                self._inflight[base] = future
+            return future
+
+    def _fetch(self, base):
+        try:
+            snapshot = RateSnapshot(base, self.fetcher(base))
+            self.store(snapshot)
+            return snapshot
+        finally:
+            with self._lock:
+                self._inflight.pop(base, None)
+
+    def store(self, snapshot):
+        with self._lock:
+            self._snapshots[snapshot.base] = snapshot
+            self._snapshots.move_to_end(snapshot.base)
+            while len(self._snapshots) > self.max_bases:
+                self._snapshots.popitem(last=False)
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                logger.exception("Rate listener %r failed", listener)
+
+    def rate(self, from_curr, to_curr):
+        return self.snapshot().cross_rate(from_curr, to_curr)
+
+    def latest(self, base=None):
+        # Last known snapshot regardless of age, for offline use
+        with self._lock:
+            return self._snapshots.get(base or self.base)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class RateHistory:
+    # Append-only columnar store of fetched rate tables. times.f64 holds the
+    # fetch times (epoch seconds, ascending) and each <CODE>.f64 holds that
+    # currency's rate against the store's base, one float64 per row; reads
+    # memory-map the files. Columns are written before the time so a
+    # crash mid-append leaves at most an ignored partial row.
+    def __init__(self, path="rate_history", base="USD"):
+        self.path = path
+        self.base = base
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.f64")
+
+    def _rows(self):
+        try:
+            return os.path.getsize(self._file("times")) // 8
+        except FileNotFoundError:
+            return 0
+
+    def _column(self, name, rows):
+        try:
+            if os.path.getsize(self._file(name)) < rows * 8:
+                rows = os.path.getsize(self._file(name)) // 8
+        except FileNotFoundError:
+            return None
+        if rows == 0:
+            return np.empty(0)
+        return np.memmap(self._file(name), dtype="<f8", mode="r", shape=(rows,))
+
+    def currencies(self):
+        return sorted(name[:-4] for name in os.listdir(self.path) if name.endswith(".f64") and name != "times.f64")
+
+    def append(self, snapshot):
+        rates = snapshot.rates
+        if snapshot.base != self.base:
+            # Rebase so every row is quoted against the same currency
+            if self.base not in rates:
+                return
+            rates = {code: rate / rates[self.base] for code, rate in rates.items()}
+        with self._lock:
+            rows = self._rows()
+            times = self._column("times", rows)
+            if rows and snapshot.fetched_at <= times[-1]:
+                return
+            for code in set(self.currencies()) | set(rates):
+                with open(self._file(code), "ab") as f:
+                    size = f.tell() // 8
+                    if size > rows:
+                        f.truncate(rows * 8)  # drop a partial row left by a crash
+                        size = rows
+                    if size < rows:
+                        # Currency first seen now: earlier rows have no rate
+                        f.write(np.full(rows - size, np.nan).astype("<f8").tobytes())
+                    f.write(np.array([rates.get(code, np.nan)], dtype="<f8").tobytes())
+            with open(self._file("times"), "ab") as f:
+                f.write(np.array([snapshot.fetched_at], dtype="<f8").tobytes())
+
+    def query(self, from_curr, to_curr, start=None, end=None, max_points=300):
+        # Returns (times, rates) for the pair between start and end (epoch
+        # seconds). Both ends are found by binary search on the time column.
+        # Longer ranges are cut into max_points // 2 buckets and each bucket
+        # contributes its min and max, so spikes survive downsampling.
+        rows = self._rows()
+        times = self._column("times", rows)
+        from_rates = self._column(from_curr, rows)
+        to_rates = self._column(to_curr, rows)
+        if times is None or from_rates is None or to_rates is None:
+            return np.empty(0), np.empty(0)
+        # A concurrent append may have written some columns but not others yet
+        rows = min(len(times), len(from_rates), len(to_rates))
+        times = times[:rows]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = rows if end is None else int(np.searchsorted(times, end, side="right"))
+        t = np.asarray(times[lo:hi])
+        values = np.asarray(to_rates[lo:hi]) / np.asarray(from_rates[lo:hi])
+        keep = ~np.isnan(values)
+        t, values = t[keep], values[keep]
+        buckets = max(1, max_points // 2)
+        if len(values) <= max_points:
+            return t, values
+        edges = np.linspace(0, len(values), buckets + 1).astype(np.intp)[:-1]
+        lows = np.minimum.reduceat(values, edges)
+        highs = np.maximum.reduceat(values, edges)
+        bucket_times = np.add.reduceat(t, edges) / np.diff(np.append(edges, len(values)))
+        return np.repeat(bucket_times, 2), np.column_stack([lows, highs]).reshape(-1)
+
+
+class HistoryBuffer:
+    # Ring buffer of conversion history entries, newest first, capped both
+    # by entry count and by the total size of the entry strings.
+    def __init__(self, max_entries=1000, max_bytes=256 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = deque()
+
+    @staticmethod
+    def entry_size(entry):
+        return sum(len(field) for field in entry)
+
+    def append(self, entry):
+        self._entries.appendleft(entry)
+        self.size += self.entry_size(entry)
+        while len(self._entries) > self.max_entries or (self.size > self.max_bytes and len(self._entries) > 1):
+            self.size -= self.entry_size(self._entries.pop())
+
+    def extend(self, entries):
+        # entries oldest first, as read from the log
+        for entry in entries:
+            self.append(entry)
+
+    def window(self, offset, count):
+        return list(itertools.islice(self._entries, offset, offset + count))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HistoryLog:
+    # Append-only JSON-lines log of conversions. Startup reads only the
+    # tail; once the file passes max_bytes it is rewritten with the newest
+    # keep entries.
+    def __init__(self, path="history.log", max_bytes=1024 * 1024, keep=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep = keep
+
+    def append(self, entry):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            size = f.tell()
+        if size > self.max_bytes:
+            self.compact()
+
+    def tail(self, count):
+        # Read backwards in blocks until count complete lines are found
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(65536, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = data.splitlines()
+        if position > 0:
+            lines = lines[1:]  # first line may be cut in half
+        entries = []
+        for line in lines[-count:]:
+            try:
+                entries.append(tuple(json.loads(line)))
+            except ValueError:
+                pass  # torn final write
+        return entries
+
+    def compact(self):
+        entries = self.tail(self.keep)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(list(entry)) + "\n" for entry in entries)
+        os.replace(tmp, self.path)
+
+
+class AlertRule:
+    def __init__(self, rule_id, from_curr, to_curr, kind, value, reference=None):
+        self.id = rule_id
+        self.pair = (from_curr, to_curr)
+        self.kind = kind  # "above", "below" or "move" (value is a fraction, 0.02 = 2%)
+        self.value = value
+        self.reference = reference
+
+    def describe(self):
+        from_curr, to_curr = self.pair
+        if self.kind == "move":
+            return f"{from_curr}/{to_curr} moves {self.value:.2%}"
+        return f"{from_curr}/{to_curr} {self.kind} {self.value:g}"
+
+    def to_json(self):
+        return {"pair": list(self.pair), "kind": self.kind, "value": self.value, "reference": self.reference}
+
+
+class AlertEngine:
+    # Every rule is reduced to absolute thresholds kept in two sorted lists
+    # per pair: "above" entries fire once the rate reaches them and "below"
+    # entries once it falls to them. Checking a snapshot is then one bisect
+    # per list per pair plus the rules that actually fire. Threshold rules
+    # are one-shot; move rules re-arm around the rate they fired at.
+    def __init__(self):
+        self.rules = {}
+        self.triggered = queue.Queue()
+        self._above = {}
+        self._below = {}
+        self._unarmed = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add(self, from_curr, to_curr, kind, value, reference=None):
+        # A zero move would put both thresholds on the reference rate and
+        # fire twice per snapshot; a negative one would invert the band
+        value = float(value)
+        if kind not in ("above", "below", "move"):
+            raise ValueError(f"Unknown alert kind: {kind}")
+        if not (math.isfinite(value) and value > 0):
+            raise ValueError("Move percentage must be greater than zero" if kind == "move"
+                             else "Alert rate must be greater than zero")
+        with self._lock:
+            rule = AlertRule(self._next_id, from_curr, to_curr, kind, value, reference)
+            self._next_id += 1
+            self.rules[rule.id] = rule
+            self._arm(rule)
+            return rule
+
+    def remove(self, rule_id):
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is not None:
+                self._disarm(rule)
+
+    def _thresholds(self, rule):
+        # (above, below) thresholds for a rule; None where it has none
+        if rule.kind == "above":
+            return rule.value, None
+        if rule.kind == "below":
+            return None, rule.value
+        return rule.reference * (1 + rule.value), rule.reference * (1 - rule.value)
+
+    def _arm(self, rule):
+        if rule.kind == "move" and rule.reference is None:
+            # Armed around the first rate seen for the pair
+            self._unarmed.setdefault(rule.pair, []).append(rule)
+            return
+        above, below = self._thresholds(rule)
+        if above is not None:
+            insort(self._above.setdefault(rule.pair, []), (above, rule.id))
+        if below is not None:
+            insort(self._below.setdefault(rule.pair, []), (below, rule.id))
+
+    def _disarm(self, rule):
+        if rule in self._unarmed.get(rule.pair, []):
+            self._unarmed[rule.pair].remove(rule)
+            return
+        above, below = self._thresholds(rule)
+        for index, threshold in ((self._above, above), (self._below, below)):
+            entries = index.get(rule.pair, [])
+            if threshold is None:
+                continue
+            i = bisect_left(entries, (threshold, rule.id))
+            if i < len(entries) and entries[i] == (threshold, rule.id):
+                del entries[i]
+
+    def list_rules(self):
+        # Copied under the lock: evaluate() drops fired one-shot rules from
+        # the fetching thread
+        with self._lock:
+            return sorted(self.rules.values(), key=lambda rule: rule.id)
+
+    def pairs(self):
+        with self._lock:
+            return set(self._above) | set(self._below) | set(self._unarmed)
+
+    def evaluate(self, snapshot):
+        messages = []
+        for pair in self.pairs():
+            try:
+                rate = snapshot.cross_rate(*pair)
+            except (KeyError, ZeroDivisionError):
+                continue
+            with self._lock:
+                for rule in self._unarmed.pop(pair, []):
+                    rule.reference = rate
+                    self._arm(rule)
+                above = self._above.get(pair, [])
+                below = self._below.get(pair, [])
+                fired = above[:bisect_right(above, (rate, float("inf")))]
+                fired += below[bisect_left(below, (rate, float("-inf"))):]
+                for _, rule_id in fired:
+                    rule = self.rules.get(rule_id)
+                    if rule is None:
+                        continue
+                    self._disarm(rule)
+                    messages.append(self._message(rule, rate))
+                    if rule.kind == "move":
+                        rule.reference = rate
+                        self._arm(rule)
+                    else:
+                        del self.rules[rule.id]
+        for message in messages:
+            self.triggered.put(message)
+        return messages
+
+    @staticmethod
+    def _message(rule, rate):
+        from_curr, to_curr = rule.pair
+        if rule.kind == "move":
+            return f"Alert: {from_curr}/{to_curr} moved {rate / rule.reference - 1:+.2%} to {rate:.4f}"
+        return f"Alert: {from_curr}/{to_curr} is {rule.kind} {rule.value:g} at {rate:.4f}"
+
+
+class ConversionEngine:
+    # Cross-rate matrix built from one snapshot: matrix[i, j] converts one
+    # unit of codes[i] into codes[j], so whole arrays of (amount, from, to)
+    # convert with a single fancy-indexed multiply.
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.codes = sorted(snapshot.rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        base_rates = np.array([snapshot.rates[code] for code in self.codes], dtype=float)
+        self.matrix = base_rates[np.newaxis, :] / base_rates[:, np.newaxis]
+
+    def lookup(self, codes):
+        # Map an array of currency codes to matrix indices, -1 where unknown.
+        # Only the distinct codes go through the dict.
+        unique, inverse = np.unique(np.asarray(codes, dtype=str), return_inverse=True)
+        positions = np.array([self.index.get(code.strip().upper(), -1) for code in unique], dtype=np.intp)
+        return positions[inverse.reshape(-1)]
+
+    def convert(self, amounts, from_codes, to_codes):
+        # Returns converted amounts; rows with an unknown currency become NaN
+        amounts = np.asarray(amounts, dtype=float)
+        from_index = np.broadcast_to(self.lookup(np.atleast_1d(from_codes)), amounts.shape)
+        to_index = np.broadcast_to(self.lookup(np.atleast_1d(to_codes)), amounts.shape)
+        valid = (from_index >= 0) & (to_index >= 0)
+        result = np.full(amounts.shape, np.nan)
+        result[valid] = amounts[valid] * self.matrix[from_index[valid], to_index[valid]]
+        return result
+
+
+def parse_amounts(values):
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        # Fall back to per-value parsing so one bad cell only blanks its row
+        amounts = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                amounts[i] = float(value)
+            except ValueError:
+                pass
+        return amounts
+
+
+def convert_csv(engine, infile, outfile, amount_col="amount", from_col="from", to_col="to",
+                from_curr=None, to_curr=None, out_col="converted", chunk_size=100000):
+    # Streams rows through the engine chunk_size at a time, so memory stays
+    # bounded however large the file is. from_curr/to_curr override the
+    # per-row currency columns. Blank lines are skipped and short rows are
+    # padded, so they count as invalid rather than aborting the run.
+    # Returns (rows, invalid_rows).
+    reader = (row for row in csv.reader(infile) if any(cell.strip() for cell in row))
+    header = next(reader, None)
+    if header is None:
+        return 0, 0
+    reader = (row + [""] * (len(header) - len(row)) for row in reader)
+    writer = csv.writer(outfile)
+    writer.writerow(header + [out_col])
+    amount_i = header.index(amount_col)
+    from_i = None if from_curr else header.index(from_col)
+    to_i = None if to_curr else header.index(to_col)
+    rows = invalid = 0
+    while True:
+        chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            break
+        amounts = parse_amounts([row[amount_i] for row in chunk])
+        from_codes = from_curr or [row[from_i] for row in chunk]
+        to_codes = to_curr or [row[to_i] for row in chunk]
+        converted = engine.convert(amounts, from_codes, to_codes)
+        bad = np.isnan(converted)
+        values = np.char.mod("%.2f", converted).tolist()
+        for i in np.flatnonzero(bad):
+            values[i] = ""
+        writer.writerows(row + [value] for row, value in zip(chunk, values))
+        rows += len(chunk)
+        invalid += int(bad.sum())
+    return rows, invalid
+
+
+def load_snapshot(path):
+    # Accepts a saved API response ({"base": ..., "rates": {...}}) or a
+    # file written by save_snapshot, which also records when it was fetched
+    with open(path) as f:
+        data = json.load(f)
+    return RateSnapshot(data.get("base", "USD"), data["rates"], data.get("fetched_at"))
+
+
+def save_snapshot(snapshot, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"base": snapshot.base, "rates": snapshot.rates, "fetched_at": snapshot.fetched_at}, f)
+    os.replace(tmp, path)
+
+
+def cli(argv):
+    parser = argparse.ArgumentParser(prog="currency_converter.py",
+                                     description="Convert currency amounts in CSV files without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="Convert an amount column of a CSV file")
+    convert_parser.add_argument("input", help="Input CSV file ('-' for stdin)")
+    convert_parser.add_argument("-o", "--output", default="-", help="Output CSV file (default stdout)")
+    convert_parser.add_argument("--amount-col", default="amount", help="Column holding amounts")
+    convert_parser.add_argument("--from-col", default="from", help="Column holding source currencies")
+    convert_parser.add_argument("--to-col", default="to", help="Column holding target currencies")
+    convert_parser.add_argument("--from", dest="from_curr", help="Source currency for every row")
+    convert_parser.add_argument("--to", dest="to_curr", help="Target currency for every row")
+    convert_parser.add_argument("--out-col", default="converted", help="Name of the added column")
+    convert_parser.add_argument("--chunk-size", type=int, default=100000, help="Rows converted per batch")
+    convert_parser.add_argument("--rates", help="Saved rates JSON instead of fetching live rates")
+    args = parser.parse_args(argv)
+
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="")
+    with infile:
+        # Check the header before fetching rates or truncating the output file
+        line, header = "", []
+        for line in infile:
+            header = next(csv.reader([line]), [])
+            if any(cell.strip() for cell in header):
+                break
+        required = [args.amount_col] + [col for col, fixed in ((args.from_col, args.from_curr),
+                                                               (args.to_col, args.to_curr)) if not fixed]
+        missing = [col for col in required if col not in header]
+        if any(cell.strip() for cell in header) and missing:
+            parser.error(f"column {missing[0]!r} not found in {args.input}; "
+                         f"its columns are: {', '.join(header)}")
+        snapshot = load_snapshot(args.rates) if args.rates else RateCache().snapshot()
+        engine = ConversionEngine(snapshot)
+        outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+        with outfile:
+            rows, invalid = convert_csv(engine, itertools.chain([line], infile), outfile, args.amount_col,
+                                        args.from_col, args.to_col, args.from_curr, args.to_curr,
+                                        args.out_col, args.chunk_size)
+    print(f"{rows} rows converted, {invalid} invalid", file=sys.stderr)
+
+
 class EnhancedCurrencyConverter:
     def __init__(self, master):
         self.master = master
@@ -26,20 +613,91 @@ class EnhancedCurrencyConverter:
         self.style.configure("TLabelframe", foreground="#ecf0f1", background="#34495e")
         self.style.configure("TLabelframe.Label", foreground="#ecf0f1", background="#34495e", font=("Helvetica", 12, "bold"))
 
-        self.currencies = self.fetch_currencies()
-        self.conversion_history = []
+        # Network I/O runs on the pool; results come back through self.results
+        # and are handled on the Tk thread by process_results()
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rates")
+        self.results = queue.Queue()
+        self.pending = 0
+        self.rate_cache = RateCache()
+        # Start from the last rates saved on disk so the window never waits
+        # for the network; a background fetch refreshes them
+        saved = self.load_saved_rates()
+        if saved is not None:
+            self.rate_cache.store(saved)
+        self.rate_cache.listeners.append(self.save_rates)
+        self.rate_history = RateHistory()
+        self.rate_cache.listeners.append(self.rate_history.append)
+        self.alert_engine = AlertEngine()
+        self.rate_cache.listeners.append(self.alert_engine.evaluate)
+        # With rules set, rates are refreshed once the cache TTL runs out;
+        # a failed refresh is retried at most this often
+        self.alert_retry_seconds = 60
+        self.last_alert_poll = time.monotonic()
+        self.graph_days = 30
+        self.currencies = list(saved.rates) if saved is not None else list(DEFAULT_CURRENCIES)
+        self.figure = None
+        self.conversion_history = HistoryBuffer()
+        self.history_log = HistoryLog()
+        self.history_offset = 0
+        self.history_rows = 5
         self.favorite_conversions = []
 
         self.setup_ui()
+        self.master.protocol("WM_DELETE_WINDOW", self.close)
+        self.fetch_currencies()
+
+    def close(self):
+        # Drop queued fetches and the keep-alive connections, then the window;
+        # a fetch already in flight is bounded by the fetcher's timeouts
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.rate_cache.fetcher.close()
+        self.master.destroy()
+
+    def dispatch(self, future, on_success, on_error):
+        self.pending += 1
+        future.add_done_callback(lambda f: self.results.put((f, on_success, on_error)))
+        if self.pending == 1:
+            self.master.after(20, self.process_results)
+
+    def process_results(self):
+        while True:
+            try:
+                future, on_success, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            error = future.exception()
+            if error is None:
+                on_success(future.result())
+            else:
+                on_error(error)
+        if self.pending:
+            self.master.after(20, self.process_results)
 
     def fetch_currencies(self):
+        self.dispatch(self.rate_cache.snapshot_async(self.executor),
+                      self.on_currencies_loaded, self.on_currencies_failed)
+
+    def on_currencies_loaded(self, snapshot):
+        self.currencies = list(snapshot.rates.keys())
+        self.from_currency.configure(values=self.currencies)
+        self.to_currency.configure(values=self.currencies)
+        self.update_rate_status()
+        if self.figure is not None:
+            self.update_graph(self.from_currency.get(), self.to_currency.get())
+
+    def on_currencies_failed(self, error):
+        self.update_rate_status(offline=True)
+
+    def save_rates(self, snapshot):
+        if snapshot.base == self.rate_cache.base:
+            save_snapshot(snapshot, SAVED_RATES)
+
+    def load_saved_rates(self):
         try:
-            response = requests.get("https://api.exchangerate-api.com/v4/latest/USD")
-            data = response.json()
-            return list(data['rates'].keys())
-        except:
-            messagebox.showerror("Error", "Failed to fetch currencies. Using default list.")
-            return ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "SEK", "NZD"]
+            return load_snapshot(SAVED_RATES)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
 
     def setup_ui(self):
         self.master.columnconfigure(0, weight=1)
@@ -87,6 +745,10 @@ class EnhancedCurrencyConverter:
         result_label = ttk.Label(converter_frame, textvariable=self.result_var, font=("Helvetica", 12, "bold"))
         result_label.grid(row=4, column=0, columnspan=2, pady=10)
 
+        self.rate_status_var = tk.StringVar()
+        rate_status_label = ttk.Label(converter_frame, textvariable=self.rate_status_var, font=("Helvetica", 9))
+        rate_status_label.grid(row=5, column=0, columnspan=2)
+
         # Favorite conversions
         favorite_frame = ttk.LabelFrame(main_frame, text="Favorite Conversions", padding="10", style="TLabelframe")
         favorite_frame.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
@@ -107,6 +769,24 @@ class EnhancedCurrencyConverter:
         remove_favorite_button = ttk.Button(favorite_button_frame, text="Remove Favorite", command=self.remove_favorite)
         remove_favorite_button.grid(row=0, column=1, padx=2, pady=5, sticky="ew")
 
+        # Rate alerts on the selected favorite (or the current pair)
+        alert_frame = ttk.Frame(favorite_frame)
+        alert_frame.grid(row=2, column=0, columnspan=2, sticky="ew")
+        alert_frame.columnconfigure(1, weight=1)
+
+        self.alert_kind = ttk.Combobox(alert_frame, values=["above", "below", "move %"], width=8, state="readonly")
+        self.alert_kind.grid(row=0, column=0, padx=2, pady=2)
+        self.alert_kind.set("above")
+        self.alert_value = ttk.Entry(alert_frame, width=10)
+        self.alert_value.grid(row=0, column=1, padx=2, pady=2, sticky="ew")
+        add_alert_button = ttk.Button(alert_frame, text="Add Alert", command=self.add_alert)
+        add_alert_button.grid(row=0, column=2, padx=2, pady=2)
+
+        self.alert_listbox = tk.Listbox(alert_frame, bg="#ecf0f1", fg="#2c3e50", height=4)
+        self.alert_listbox.grid(row=1, column=0, columnspan=2, sticky="ew", pady=2)
+        remove_alert_button = ttk.Button(alert_frame, text="Remove Alert", command=self.remove_alert)
+        remove_alert_button.grid(row=1, column=2, padx=2, pady=2, sticky="n")
+
         # Conversion history
         history_frame = ttk.LabelFrame(main_frame, text="Conversion History", padding="10", style="TLabelframe")
         history_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
@@ -122,9 +802,14 @@ class EnhancedCurrencyConverter:
         self.history_tree.column("result", width=150)
         self.history_tree.grid(row=0, column=0, sticky="nsew")
 
-        history_scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL, command=self.history_tree.yview)
-        history_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.history_tree.configure(yscrollcommand=history_scrollbar.set)
+        # The tree only holds the rows that fit on screen; the scrollbar
+        # moves a window over self.conversion_history instead
+        self.history_scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL, command=self.scroll_history)
+        self.history_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.history_tree.bind("<Configure>", self.resize_history)
+        self.history_tree.bind("<MouseWheel>", lambda e: self.scroll_history("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.history_tree.bind("<Button-4>", lambda e: self.scroll_history("scroll", -1, "units"))
+        self.history_tree.bind("<Button-5>", lambda e: self.scroll_history("scroll", 1, "units"))
 
         # Rate alert
         self.alert_var = tk.StringVar()
@@ -132,49 +817,123 @@ class EnhancedCurrencyConverter:
         alert_label.grid(row=2, column=0, columnspan=2, pady=5)
 
         # Graph
-        graph_frame = ttk.Frame(main_frame)
-        graph_frame.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
-        graph_frame.columnconfigure(0, weight=1)
-        graph_frame.rowconfigure(0, weight=1)
+        # Matplotlib is only loaded when the first trend is drawn
+        self.graph_frame = ttk.Frame(main_frame)
+        self.graph_frame.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
+        self.graph_frame.columnconfigure(0, weight=1)
+        self.graph_frame.rowconfigure(0, weight=1)
 
-        self.figure, self.ax = plt.subplots(figsize=(6, 4))
-        self.canvas = FigureCanvasTkAgg(self.figure, master=graph_frame)
-        self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        self.graph_placeholder = ttk.Label(self.graph_frame, text="Convert a pair to see its rate trend")
+        self.graph_placeholder.grid(row=0, column=0)
 
         self.load_favorites()
-        self.update_graph("USD", "EUR")
+        self.load_alerts()
+        self.load_history()
+        self.master.after(1000, self.poll_alerts)
 
     def convert(self):
         try:
             amount = float(self.amount.get())
-            from_curr = self.from_currency.get()
-            to_curr = self.to_currency.get()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number")
+            return
+        from_curr = self.from_currency.get()
+        to_curr = self.to_currency.get()
+        latest = self.rate_cache.latest()
+        if latest is not None and self.rate_cache.cached() is None:
+            # Stale rates: answer at once with them rather than waiting out
+            # the fetcher's retries, and refresh in the background
+            self.finish_conversion(amount, from_curr, to_curr, latest)
+            self.fetch_currencies()
+            return
+        self.dispatch(self.rate_cache.snapshot_async(self.executor),
+                      lambda snapshot: self.finish_conversion(amount, from_curr, to_curr, snapshot),
+                      lambda error: self.on_rate_failed(error, amount, from_curr, to_curr))
+
+    def on_rate_failed(self, error, amount, from_curr, to_curr):
+        if not isinstance(error, (requests.RequestException, ValueError, KeyError)):
+            raise error
+        latest = self.rate_cache.latest()
+        if latest is None:
+            messagebox.showerror("Error", "Failed to fetch exchange rate")
+            return
+        # Offline: convert with the last known rates and say so
+        self.finish_conversion(amount, from_curr, to_curr, latest)
+        self.update_rate_status(offline=True)
 
-            url = f"https://api.exchangerate-api.com/v4/latest/{from_curr}"
-            response = requests.get(url)
-            data = response.json()
-            rate = data['rates'][to_curr]
+    def finish_conversion(self, amount, from_curr, to_curr, snapshot):
+        try:
+            rate = snapshot.cross_rate(from_curr, to_curr)
 
             result = amount * rate
             self.result_var.set(f"{amount:.2f} {from_curr} = {result:.2f} {to_curr}")
+            self.update_rate_status()
 
             # Add to history
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             history_entry = (timestamp, f"{amount:.2f} {from_curr} to {to_curr}", f"{result:.2f} {to_curr}")
-            self.history_tree.insert("", 0, values=history_entry)
-
-            # Simulate rate alert
-            self.simulate_rate_alert()
+            self.add_history(history_entry)
 
             # Update graph
             self.update_graph(from_curr, to_curr)
 
-        except ValueError:
-            messagebox.showerror("Error", "Please enter a valid number")
         except KeyError:
             messagebox.showerror("Error", "Invalid currency selection")
-        except requests.RequestException:
-            messagebox.showerror("Error", "Failed to fetch exchange rate")
+
+    def add_history(self, entry):
+        self.conversion_history.append(entry)
+        self.history_log.append(entry)
+        self.history_offset = 0
+        self.render_history()
+
+    def load_history(self):
+        self.conversion_history.extend(self.history_log.tail(self.conversion_history.max_entries))
+        self.render_history()
+
+    def resize_history(self, event):
+        row_height = int(self.style.lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.history_rows:
+            self.history_rows = rows
+            self.render_history()
+
+    def scroll_history(self, action, amount, unit=None):
+        total = len(self.conversion_history)
+        if action == "moveto":
+            offset = int(float(amount) * total)
+        else:
+            offset = self.history_offset + int(amount) * (self.history_rows if unit == "pages" else 1)
+        self.history_offset = max(0, min(offset, total - self.history_rows))
+        self.render_history()
+
+    def render_history(self):
+        entries = self.conversion_history.window(self.history_offset, self.history_rows)
+        for i in range(max(self.history_rows, len(self.history_tree.get_children()))):
+            iid = f"row{i}"
+            if i < len(entries):
+                if self.history_tree.exists(iid):
+                    self.history_tree.item(iid, values=entries[i])
+                else:
+                    self.history_tree.insert("", i, iid=iid, values=entries[i])
+            elif self.history_tree.exists(iid):
+                self.history_tree.delete(iid)
+        total = len(self.conversion_history)
+        if total <= self.history_rows:
+            self.history_scrollbar.set(0, 1)
+        else:
+            self.history_scrollbar.set(self.history_offset / total, (self.history_offset + len(entries)) / total)
+
+    def update_rate_status(self, offline=False):
+        snapshot = self.rate_cache.latest()
+        if snapshot is None:
+            self.rate_status_var.set("Offline · using the default currency list" if offline else "")
+            return
+        minutes = int(snapshot.age() // 60)
+        age = "just now" if minutes == 0 else f"{minutes} min ago"
+        if offline:
+            self.rate_status_var.set(f"Offline · using saved rates from {age}")
+        else:
+            self.rate_status_var.set(f"Rates updated {age} · cache hit rate {self.rate_cache.hit_rate():.0%}")
 
     def swap_currencies(self):
         from_curr = self.from_currency.get()
@@ -182,30 +941,147 @@ class EnhancedCurrencyConverter:
         self.from_currency.set(to_curr)
         self.to_currency.set(from_curr)
 
-    def simulate_rate_alert(self):
-        if random.random() < 0.2:  # 20% chance of alert
-            change = random.uniform(-0.05, 0.05)
-            alert_message = f"Alert: {self.from_currency.get()}/{self.to_currency.get()} rate changed by {change:.2%}"
-            self.alert_var.set(alert_message)
-        else:
-            self.alert_var.set("")
+    def selected_pair(self):
+        selection = self.favorite_listbox.curselection()
+        if selection:
+            from_curr, _, to_curr = self.favorite_listbox.get(selection[0]).partition(" to ")
+            return from_curr, to_curr
+        return self.from_currency.get(), self.to_currency.get()
 
-    def update_graph(self, from_curr, to_curr):
-        # Simulate historical data
-        dates = [datetime.now() - timedelta(days=i) for i in range(7, 0, -1)]
-        rates = [random.uniform(0.8, 1.2) for _ in range(7)]
+    def add_alert(self):
+        try:
+            value = float(self.alert_value.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid alert value")
+            return
+        from_curr, to_curr = self.selected_pair()
+        kind = self.alert_kind.get()
+        reference = None
+        if kind == "move %":
+            kind, value = "move", value / 100
+            snapshot = self.rate_cache.cached()
+            if snapshot is not None:
+                try:
+                    reference = snapshot.cross_rate(from_curr, to_curr)
+                except KeyError:
+                    pass
+        try:
+            self.alert_engine.add(from_curr, to_curr, kind, value, reference)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.refresh_alerts()
+        self.save_alerts()
 
-        self.ax.clear()
-        self.ax.plot(dates, rates, color='#3498db')
-        self.ax.set_title(f"{from_curr}/{to_curr} Exchange Rate Trend", color='#ecf0f1')
+    def remove_alert(self):
+        selection = self.alert_listbox.curselection()
+        if selection:
+            self.alert_engine.remove(self.alert_rule_ids[selection[0]])
+            self.refresh_alerts()
+            self.save_alerts()
+
+    def refresh_alerts(self):
+        rules = self.alert_engine.list_rules()
+        self.alert_rule_ids = [rule.id for rule in rules]
+        self.alert_listbox.delete(0, tk.END)
+        for rule in rules:
+            self.alert_listbox.insert(tk.END, rule.describe())
+
+    def poll_alerts(self):
+        # Runs on the Tk thread: shows alerts queued by the engine (which
+        # evaluates every new snapshot on the fetching thread) and, when
+        # rules exist, fetches a fresh snapshot once the cached one expires.
+        # Checking cached() first keeps these polls out of the hit rate.
+        messages = []
+        while True:
+            try:
+                messages.append(self.alert_engine.triggered.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.alert_var.set(" | ".join(messages[-3:]))
+            self.refresh_alerts()
+            self.save_alerts()
+        if (self.alert_engine.list_rules() and self.rate_cache.cached() is None
+                and time.monotonic() - self.last_alert_poll > self.alert_retry_seconds):
+            self.last_alert_poll = time.monotonic()
+            self.dispatch(self.rate_cache.snapshot_async(self.executor), lambda snapshot: None, lambda error: None)
+        self.master.after(1000, self.poll_alerts)
+
+    def save_alerts(self):
+        with open("alerts.json", "w") as f:
+            json.dump([rule.to_json() for rule in self.alert_engine.list_rules()], f)
+
+    def load_alerts(self):
+        try:
+            with open("alerts.json", "r") as f:
+                for rule in json.load(f):
+                    try:
+                        self.alert_engine.add(*rule["pair"], rule["kind"], rule["value"], rule.get("reference"))
+                    except ValueError:
+                        # Saved before rules were validated; drop it
+                        pass
+        except FileNotFoundError:
+            pass
+        self.refresh_alerts()
+
+    def setup_graph(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.graph_placeholder.destroy()
+        self.figure = Figure(figsize=(6, 4))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.graph_frame)
+        self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+
+        # Styling and artists are created once; redraw_graph only swaps data
+        self.ax.set_title("Exchange Rate Trend", color='#ecf0f1')
         self.ax.set_xlabel("Date", color='#ecf0f1')
         self.ax.set_ylabel("Exchange Rate", color='#ecf0f1')
         self.ax.tick_params(axis='x', rotation=45, colors='#ecf0f1')
         self.ax.tick_params(axis='y', colors='#ecf0f1')
         self.ax.set_facecolor('#2c3e50')
+        self.ax.xaxis_date()
         self.figure.patch.set_facecolor('#2c3e50')
+        self.trend_line, = self.ax.plot([], [], color='#3498db')
+        self.empty_text = self.ax.text(0.5, 0.5, "No recorded rates yet", transform=self.ax.transAxes,
+                                       ha='center', va='center', color='#ecf0f1')
         self.figure.tight_layout()
-        self.canvas.draw()
+        self.graph_pair = None
+        self.shown_pair = None
+        self.graph_redraw_pending = False
+
+    def update_graph(self, from_curr, to_curr):
+        if self.figure is None:
+            self.setup_graph()
+        # Coalesce bursts of conversions into one redraw of the latest pair
+        self.graph_pair = (from_curr, to_curr)
+        if not self.graph_redraw_pending:
+            self.graph_redraw_pending = True
+            self.master.after(50, self.redraw_graph)
+
+    def redraw_graph(self):
+        self.graph_redraw_pending = False
+        from_curr, to_curr = self.graph_pair
+        # Recorded history of fetched rates over the last graph_days days,
+        # decimated to min/max pairs per horizontal pixel of the axes
+        width = max(50, int(self.ax.get_window_extent().width))
+        start = (datetime.now() - timedelta(days=self.graph_days)).timestamp()
+        times, rates = self.rate_history.query(from_curr, to_curr, start=start, max_points=2 * width)
+        # Matplotlib date numbers are days since the epoch; shift to local time
+        dates = (times + time.localtime().tm_gmtoff) / 86400.0
+
+        self.trend_line.set_data(dates, rates)
+        self.trend_line.set_marker('o' if len(rates) == 1 else '')
+        self.empty_text.set_visible(not len(rates))
+        if self.graph_pair != self.shown_pair:
+            self.ax.set_title(f"{from_curr}/{to_curr} Exchange Rate Trend", color='#ecf0f1')
+            self.shown_pair = self.graph_pair
+        if len(rates):
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.canvas.draw_idle()
 
     def add_to_favorites(self):
         favorite = f"{self.from_currency.get()} to {self.to_currency.get()}"
@@ -237,7 +1113,10 @@ class EnhancedCurrencyConverter:
             pass
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = EnhancedCurrencyConverter(root)
-    root.mainloop()
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        root = tk.Tk()
+        app = EnhancedCurrencyConverter(root)
+        root.mainloop()
 
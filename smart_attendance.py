@@ -1,36 +1,288 @@
 import streamlit as st
-import speech_recognition as sr
-import pyttsx3
 import sqlite3
 import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
+import calendar
 import hashlib
 import smtplib
+import threading
+import collections
+import abc
+import functools
+import itertools
+import argparse
+import csv
+import io
+import tempfile
+import sys
+import os
+import importlib.util
+import logging
+import queue
+import time
+import types
+import difflib
+import unicodedata
+import contextlib
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 
-# Initialize speech and recognition engines
-recognizer = sr.Recognizer()
-engine = pyttsx3.init()
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'attendance.db'
+
+# Read-query cache
+class QueryCache:
+    """Bounded LRU cache for query results, with hit/miss counters."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) for a cached key, else (False, None)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "maxsize": self.maxsize, "hit_rate": self.hits / total if total else 0.0}
+
+def cached_query(func):
+    """Cache a read helper's result per argument set and store data version.
+
+    Any committed write changes the version, whether it came from this
+    server, another process such as the import CLI, or another server using
+    the same database file. Entries from before the write are never returned
+    again and simply age out of the LRU. Cached DataFrames are shared
+    between callers and must not be modified.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = get_store()
+        # Read the version before querying: a write racing with the query
+        # files its result under the old version, which is never looked up again
+        key = (func.__name__, args, tuple(sorted(kwargs.items())), store.version())
+        found, value = store.cache.get(key)
+        if not found:
+            value = func(*args, **kwargs)
+            store.cache.put(key, value)
+        return value
+    return wrapper
+
+# Shared storage layer
+class AttendanceStore:
+    """SQLite storage backed by a small pool of WAL-mode connections.
+
+    Connections are checked out for the length of a ``with`` block and then
+    returned, so short-lived threads (every Streamlit rerun gets a new one)
+    share a fixed set of connections instead of each opening their own.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+    # An uncontended BEGIN IMMEDIATE takes microseconds; longer means we queued
+    LOCK_WAIT_THRESHOLD = 0.001
+    POOL_SIZE = 8
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle = []
+        self.opened = 0
+        # Read-only connection whose PRAGMA data_version tracks everyone's commits
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+        self.cache = QueryCache()
+        # Write transactions that had to wait for another writer's lock
+        self.lock_waits = 0
+        self.lock_wait_seconds = 0.0
+
+    def _connect(self):
+        # Autocommit mode; writers open explicit transactions below. A pooled
+        # connection moves between threads, one at a time, hence
+        # check_same_thread=False.
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self, shared=True):
+        """Check out a pooled connection for the duration of the block.
+
+        Nested shared checkouts on the same thread reuse the outer
+        connection, so helpers can be called from inside a transaction.
+        ``shared=False`` always takes a connection of its own and leaves the
+        thread's checkout alone; use it when the block may be suspended, as
+        in a generator, and resumed or closed elsewhere. When all
+        ``pool_size`` connections are in use, callers wait for one.
+        """
+        held = getattr(self._local, 'conn', None) if shared else None
+        if held is not None:
+            yield held
+            return
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+            if shared:
+                self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                if shared:
+                    self._local.conn = None
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Run a write transaction, taking the write lock up front."""
+        with self.connection() as conn:
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            waited = time.perf_counter() - started
+            if waited > self.LOCK_WAIT_THRESHOLD:
+                with self._lock:
+                    self.lock_waits += 1
+                    self.lock_wait_seconds += waited
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def version(self):
+        """Return a value that changes whenever anyone commits to the database.
+
+        SQLite's PRAGMA data_version changes when another connection, in
+        this process or any other, has committed since the last call. The
+        watcher connection never writes, so every commit counts.
+        """
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = self._connect()
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Close the idle pooled connections; call once no queries are running."""
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+        with self._watcher_lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+@st.cache_resource
+def get_store():
+    """Return the store shared by all sessions of this Streamlit server."""
+    return AttendanceStore(DB_PATH)
 
 # Database setup
+# Recompute the rollup table from the raw attendance rows
+BACKFILL_ROLLUP = '''INSERT INTO attendance_rollup (day, hour, event, count)
+                     SELECT substr(timestamp, 1, 10), CAST(substr(timestamp, 12, 2) AS INTEGER),
+                            COALESCE(event, ''), COUNT(*)
+                     FROM attendance WHERE ts IS NOT NULL GROUP BY 1, 2, 3'''
+
+# Add to an hourly rollup bucket, creating it if needed
+UPSERT_ROLLUP = '''INSERT INTO attendance_rollup (day, hour, event, count) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (day, hour, event) DO UPDATE SET count = count + excluded.count'''
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one run.
+MIGRATIONS = [
+    # 1: users and attendance tables
+    (
+        '''CREATE TABLE IF NOT EXISTS users
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS attendance
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            timestamp TEXT,
+            event TEXT)''',
+    ),
+    # 2: numeric epoch timestamps and indexes for filtered, date-ranged reports
+    (
+        "ALTER TABLE attendance ADD COLUMN ts INTEGER",
+        "UPDATE attendance SET ts = CAST(strftime('%s', timestamp) AS INTEGER)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_event_ts ON attendance (event, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_name_ts ON attendance (name, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_ts ON attendance (ts)",
+    ),
+    # 3: per-day/hour/event counts kept up to date by every insert
+    (
+        '''CREATE TABLE IF NOT EXISTS attendance_rollup
+           (day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, hour, event))''',
+        BACKFILL_ROLLUP,
+    ),
+    # 4: canonical attendee roster used to resolve recognized names
+    (
+        "CREATE TABLE IF NOT EXISTS attendees (name TEXT PRIMARY KEY)",
+    ),
+]
+
+# Attendance insert; ?2 is the TEXT timestamp, stored again as epoch seconds
+INSERT_ATTENDANCE = ("INSERT INTO attendance (name, timestamp, event, ts) "
+                     "VALUES (?1, ?2, ?3, CAST(strftime('%s', ?2) AS INTEGER))")
+
 def init_db():
-    """Initialize the SQLite database with users and attendance tables."""
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    # Users table for authentication
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE,
-                  password TEXT)''')
-    # Attendance table for recording attendance
-    c.execute('''CREATE TABLE IF NOT EXISTS attendance
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT,
-                  timestamp TEXT,
-                  event TEXT)''')
-    conn.commit()
-    conn.close()
+    """Create or upgrade the SQLite schema by running any pending migrations."""
+    store = get_store()
+    with store.connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return
+    with store.transaction() as conn:
+        # Re-read under the write lock in case another session migrated first
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
 
 # Hash password for security
 def hash_password(password):
@@ -40,84 +292,1010 @@ def hash_password(password):
 # Add new user to the database
 def add_user(username, password):
     """Add a new user with a hashed password to the database."""
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
     try:
         hashed_pw = hash_password(password)
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_pw))
-        conn.commit()
+        with get_store().transaction() as conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_pw))
         st.success(f"User {username} added successfully.")
     except sqlite3.IntegrityError:
         st.error("Username already exists.")
-    finally:
-        conn.close()
 
 # Authenticate user
 def authenticate(username, password):
     """Verify user credentials against the database."""
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username=?", (username,))
-    result = c.fetchone()
-    conn.close()
+    with get_store().connection() as conn:
+        result = conn.execute("SELECT password FROM users WHERE username=?", (username,)).fetchone()
     return result and result[0] == hash_password(password)
 
 # Mark attendance in the database
 def mark_attendance(name, event="General"):
     """Record attendance with the given name, event, and timestamp."""
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO attendance (name, timestamp, event) VALUES (?, ?, ?)", (name, timestamp, event))
-    conn.commit()
-    conn.close()
+    with get_store().transaction() as conn:
+        conn.execute(INSERT_ATTENDANCE, (name, timestamp, event))
+        conn.execute(UPSERT_ROLLUP, rollup_bucket(timestamp, event) + (1,))
     return True
 
+def rollup_bucket(timestamp, event):
+    """Return the (day, hour, event) rollup key for a 'YYYY-MM-DD HH:MM:SS' timestamp."""
+    return timestamp[:10], int(timestamp[11:13] or 0), event or ''
+
+def rebuild_rollups():
+    """Recompute attendance_rollup from scratch, e.g. after editing raw rows."""
+    with get_store().transaction() as conn:
+        conn.execute("DELETE FROM attendance_rollup")
+        conn.execute(BACKFILL_ROLLUP)
+
+# Timestamp layouts accepted on import; all are stored as 'YYYY-MM-DD HH:MM:SS'
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+def parse_timestamp(value):
+    """Normalize an imported timestamp to 'YYYY-MM-DD HH:MM:SS'; raise ValueError if unparseable.
+
+    Accepts strings in any of TIMESTAMP_FORMATS as well as date and
+    datetime objects.
+    """
+    if isinstance(value, datetime.date):
+        return value.strftime(TIMESTAMP_FORMATS[0])
+    if not isinstance(value, str):
+        raise ValueError(f"Unsupported timestamp: {value!r}")
+    value = value.strip()
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).strftime(TIMESTAMP_FORMATS[0])
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognized timestamp: {value!r}")
+
+# Mark attendance for many attendees in one transaction
+def mark_attendance_many(records, event="General", rejected=None):
+    """Record a batch of attendance rows with a single commit.
+
+    Each record is a name, or a (name, event) or (name, event, timestamp)
+    tuple; missing fields default to ``event`` and the current time. The
+    records are consumed lazily, so generators stream straight into SQLite.
+    Records whose timestamp cannot be parsed are skipped and, if
+    ``rejected`` is a list, appended to it. Returns the number of rows
+    inserted.
+    """
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    count = skipped = 0
+    buckets = collections.Counter()
+
+    def rows():
+        nonlocal count, skipped
+        for record in records:
+            if isinstance(record, str):
+                record = (record,)
+            name = (record[0] or '').strip()
+            if not name:
+                continue
+            row_event = record[1] if len(record) > 1 and record[1] else event
+            timestamp = now
+            if len(record) > 2 and record[2]:
+                try:
+                    timestamp = parse_timestamp(record[2])
+                except ValueError:
+                    # Stored as-is it would get a NULL ts and escape date filters,
+                    # keyset pages and rollups
+                    skipped += 1
+                    if rejected is not None:
+                        rejected.append(record)
+                    continue
+            count += 1
+            buckets[rollup_bucket(timestamp, row_event)] += 1
+            yield name, timestamp, row_event
+
+    with get_store().transaction() as conn:
+        conn.executemany(INSERT_ATTENDANCE, rows())
+        # One upsert per bucket rather than per row
+        conn.executemany(UPSERT_ROLLUP, (key + (n,) for key, n in buckets.items()))
+    if skipped:
+        logger.warning("Skipped %d attendance rows with unparseable timestamps", skipped)
+    return count
+
+# Import a CSV roster or check-in log
+def read_roster(fileobj):
+    """Yield (name, event, timestamp) tuples from a CSV file, streaming row by row.
+
+    Files with a header row may use ``name``, ``event`` and ``timestamp``
+    columns; otherwise the first three columns are taken in that order.
+    Blank lines are skipped.
+    """
+    reader = (row for row in csv.reader(fileobj) if any(cell.strip() for cell in row))
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [col.strip().lower() for col in first]
+    if 'name' in header:
+        columns = [header.index(col) if col in header else None for col in ('name', 'event', 'timestamp')]
+    else:
+        columns = [0, 1, 2]
+        reader = _chain_row(first, reader)
+    for row in reader:
+        yield tuple(row[i] if i is not None and i < len(row) else None for i in columns)
+
+def _chain_row(first, reader):
+    yield first
+    yield from reader
+
+def import_roster(fileobj, event="General", rejected=None):
+    """Mark attendance for every row of a CSV roster; returns the row count.
+
+    Rows with an unparseable timestamp are collected in ``rejected``, as for
+    mark_attendance_many().
+    """
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    return mark_attendance_many(read_roster(fileobj), event, rejected)
+
 # Get attendance data from the database
-def get_attendance_data(name=None, event=None):
-    """Retrieve attendance data, optionally filtered by name and event."""
-    conn = sqlite3.connect('attendance.db')
-    query = "SELECT name, timestamp, event FROM attendance"
-    params = []
+def to_epoch(value):
+    """Convert a date or naive datetime to the epoch seconds stored in ``ts``."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return calendar.timegm(value.timetuple())
+
+def attendance_filter(name=None, event=None, start=None, end=None):
+    """Build the WHERE clause and parameters shared by attendance queries.
+
+    ``start`` is inclusive; ``end`` is exclusive for datetimes and covers
+    the whole day when given as a date.
+    """
+    clauses, params = [], []
     if name:
-        query += " WHERE name=?"
+        clauses.append("name=?")
         params.append(name)
     if event:
-        query += " WHERE event=?" if not name else " AND event=?"
+        clauses.append("event=?")
         params.append(event)
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    if start:
+        clauses.append("ts>=?")
+        params.append(to_epoch(start))
+    if end:
+        if not isinstance(end, datetime.datetime):
+            end = end + datetime.timedelta(days=1)
+        clauses.append("ts<?")
+        params.append(to_epoch(end))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
 
-# Voice recognition with language support
-def listen(language="en-US"):
-    """Capture and recognize voice input with the specified language."""
-    with sr.Microphone() as source:
-        st.write("Adjusting for ambient noise... Please wait.")
-        recognizer.adjust_for_ambient_noise(source, duration=2)
-        st.write("Listening...")
-        audio = recognizer.listen(source, timeout=5)
+@cached_query
+def get_attendance_data(name=None, event=None, start=None, end=None):
+    """Retrieve attendance data, optionally filtered by name, event and date range."""
+    where, params = attendance_filter(name, event, start, end)
+    query = "SELECT name, timestamp, event FROM attendance" + where + " ORDER BY ts"
+    import pandas as pd
+    with get_store().connection() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+REPORT_COLUMNS = ["name", "timestamp", "event"]
+REPORT_PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 5000
+
+# Keyset-paginated attendance browsing
+@cached_query
+def get_attendance_page(name=None, event=None, start=None, end=None, after=None, limit=REPORT_PAGE_SIZE):
+    """Return one page of filtered attendance rows and the cursor for the next page.
+
+    Pages are ordered by (ts, id); ``after`` is the cursor returned by the
+    previous call, so each page is an index seek rather than an OFFSET scan.
+    The returned cursor is None on the last page.
+    """
+    where, params = attendance_filter(name, event, start, end)
+    if after is not None:
+        where += (" AND " if where else " WHERE ") + "(ts, id) > (?, ?)"
+        params.extend(after)
+    query = ("SELECT name, timestamp, event, ts, id FROM attendance" + where +
+             " ORDER BY ts, id LIMIT ?")
+    with get_store().connection() as conn:
+        rows = conn.execute(query, params + [limit]).fetchall()
+    next_cursor = rows[-1][3:] if len(rows) == limit else None
+    import pandas as pd
+    return pd.DataFrame([row[:3] for row in rows], columns=REPORT_COLUMNS), next_cursor
+
+def iter_attendance_rows(name=None, event=None, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield batches of filtered (name, timestamp, event) rows straight from the cursor."""
+    where, params = attendance_filter(name, event, start, end)
+    query = "SELECT name, timestamp, event FROM attendance" + where + " ORDER BY ts, id"
+    # A connection of its own stays checked out until the generator is
+    # exhausted or closed, so queries run between batches never share it
+    with get_store().connection(shared=False) as conn:
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            cursor.close()
+
+# Streaming report export
+def iter_attendance_csv(name=None, event=None, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield a filtered attendance report as CSV text, one batch of rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_COLUMNS)
+    for batch in iter_attendance_rows(name, event, start, end, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_attendance(path, name=None, event=None, start=None, end=None, fmt="csv"):
+    """Write a filtered attendance report to ``path`` in fixed-size batches.
+
+    ``fmt`` is "csv" or "parquet"; Parquet output needs pyarrow installed
+    and writes one row group per batch. Returns the number of rows written.
+    """
+    count = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        schema = pa.schema([(column, pa.string()) for column in REPORT_COLUMNS])
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in iter_attendance_rows(name, event, start, end):
+                writer.write_table(pa.Table.from_pylist([dict(zip(REPORT_COLUMNS, row)) for row in batch], schema))
+                count += len(batch)
+        return count
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for batch in iter_attendance_rows(name, event, start, end):
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+def attendance_csv_file(name=None, event=None, start=None, end=None):
+    """Stream a CSV report into an anonymous temporary file and return it rewound.
+
+    The file is unbuffered (a raw ``io.FileIO``), which st.download_button
+    accepts; the report is written batch by batch and never held in memory
+    by this function.
+    """
+    spool = tempfile.TemporaryFile(buffering=0)
+    for chunk in iter_attendance_csv(name, event, start, end):
+        spool.write(chunk.encode("utf-8"))
+    spool.seek(0)
+    return spool
+
+# Daily attendance counts from the rollup table
+@cached_query
+def get_daily_counts(event=None, start=None, end=None):
+    """Return attendance counts per day, optionally for one event and date range."""
+    clauses, params = [], []
+    if event:
+        clauses.append("event=?")
+        params.append(event)
+    if start:
+        clauses.append("day>=?")
+        params.append(start.isoformat()[:10])
+    if end:
+        clauses.append("day<=?")
+        params.append(end.isoformat()[:10])
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    query = "SELECT day, SUM(count) AS count FROM attendance_rollup" + where + " GROUP BY day ORDER BY day"
+    import pandas as pd
+    with get_store().connection() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+# Voice engines, created on first use so the login page renders without them
+class VoiceBackend(abc.ABC):
+    """Interface for speech recognition and text-to-speech.
+
+    Continuous check-in uses the three lower-level steps: ``open_source``
+    for a microphone or recorded WAV file, ``capture`` to split it into
+    utterances, and ``recognize`` to turn one utterance into text.
+    """
+
+    @abc.abstractmethod
+    def listen(self, language="en-US", status=print):
+        """Capture one utterance and return its lower-cased text, or None."""
+
+    @abc.abstractmethod
+    def speak(self, text):
+        """Say ``text`` aloud."""
+
+    @abc.abstractmethod
+    def open_source(self, path=None):
+        """Return a context manager for the microphone, or for a recorded file at ``path``."""
+
+    @abc.abstractmethod
+    def capture(self, source, stop_event):
+        """Yield utterances from an open source until ``stop_event`` is set or it runs out."""
+
+    @abc.abstractmethod
+    def recognize(self, audio, language="en-US", status=print):
+        """Return the lower-cased text of one utterance, or None."""
+
+class SystemVoiceBackend(VoiceBackend):
+    """Microphone input via speech_recognition and speech output via pyttsx3.
+
+    Ambient-noise calibration runs once and the resulting energy threshold
+    is reused until it is ``recalibrate_every`` seconds old. Recorded files
+    are never calibrated against, as that would consume their opening
+    seconds. pyttsx3 is optional; without it the backend stays silent.
+    """
+
+    def __init__(self, calibration_seconds=2.0, recalibrate_every=300.0, phrase_time_limit=4.0):
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_every = recalibrate_every
+        self.phrase_time_limit = phrase_time_limit
+        self._sr = None
+        self._recognizer = None
+        self._tts = None
+        self._calibrated_at = None
+
+    @staticmethod
+    def available():
+        """Check that speech recognition is installed without importing it."""
+        return importlib.util.find_spec("speech_recognition") is not None
+
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._sr = sr
+            self._recognizer = sr.Recognizer()
+        return self._recognizer
+
+    @property
+    def tts(self):
+        if self._tts is None:
+            try:
+                import pyttsx3
+                self._tts = pyttsx3.init()
+            except (ImportError, OSError, RuntimeError):
+                # No speech driver on this machine; stay silent from now on
+                self._tts = False
+        return self._tts
+
+    def calibrate(self, source, force=False):
+        """Adjust the energy threshold if it was never set or has gone stale."""
+        now = time.monotonic()
+        stale = self._calibrated_at is None or now - self._calibrated_at > self.recalibrate_every
+        if force or stale:
+            self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration_seconds)
+            self._calibrated_at = now
+            return True
+        return False
+
+    def open_source(self, path=None):
+        self.recognizer  # imports speech_recognition on first use
+        return self._sr.AudioFile(path) if path else self._sr.Microphone()
+
+    def listen(self, language="en-US", status=print):
+        with self.open_source() as source:
+            if self._calibrated_at is None:
+                status("Adjusting for ambient noise... Please wait.")
+            self.calibrate(source)
+            status("Listening...")
+            try:
+                audio = self.recognizer.listen(source, timeout=5)
+            except self._sr.WaitTimeoutError:
+                status("No speech detected")
+                return None
+        text = self.recognize(audio, language, status)
+        if text:
+            status(f"Recognized: {text}")
+        return text
+
+    def capture(self, source, stop_event):
+        recognizer = self.recognizer
+        recorded = isinstance(source, self._sr.AudioFile)
+        while not stop_event.is_set():
+            if not recorded:
+                self.calibrate(source)
+            try:
+                audio = recognizer.listen(source, timeout=1, phrase_time_limit=self.phrase_time_limit)
+            except self._sr.WaitTimeoutError:
+                continue
+            if not audio.frame_data:
+                return  # end of a recorded file
+            yield audio
+
+    def recognize(self, audio, language="en-US", status=print):
+        sr = self._sr
         try:
-            text = recognizer.recognize_google(audio, language=language)
-            st.write(f"Recognized: {text}")
-            return text.lower()
+            return self.recognizer.recognize_google(audio, language=language).lower()
         except sr.UnknownValueError:
-            st.write("Sorry, I didn't catch that.")
+            status("Sorry, I didn't catch that.")
             return None
         except sr.RequestError as e:
-            st.write(f"Speech service error: {e}")
+            status(f"Speech service error: {e}")
             return None
 
+    def speak(self, text):
+        if self.tts:
+            self.tts.say(text)
+            self.tts.runAndWait()
+
+class FakeVoiceBackend(VoiceBackend):
+    """Voice backend for headless servers and tests: scripted input, recorded output.
+
+    Scripted utterances stand in for audio, so ``capture`` yields them and
+    ``recognize`` returns them unchanged.
+    """
+
+    def __init__(self, utterances=()):
+        self.utterances = collections.deque(utterances)
+        self.spoken = []
+
+    def listen(self, language="en-US", status=print):
+        if not self.utterances:
+            status("Voice input is not available on this server.")
+            return None
+        text = self.utterances.popleft()
+        status(f"Recognized: {text}")
+        return text.lower()
+
+    def open_source(self, path=None):
+        return contextlib.nullcontext(path)
+
+    def capture(self, source, stop_event):
+        while self.utterances and not stop_event.is_set():
+            yield self.utterances.popleft()
+
+    def recognize(self, audio, language="en-US", status=print):
+        return audio.lower() if audio else None
+
+    def speak(self, text):
+        self.spoken.append(text)
+
+# Continuous voice check-in
+class CheckInSession:
+    """Listen continuously and check attendees in back to back.
+
+    One capture thread splits the audio source into utterances and queues
+    them; ``recognizers`` threads turn each one into text and pass it to
+    ``on_text``. The backend calibrates once and reuses the threshold, so
+    after the first few seconds no time is spent on calibration.
+    Pass ``path`` to replay a recorded WAV file instead of the microphone.
+    """
+
+    def __init__(self, backend, on_text, language="en-US", path=None, recognizers=4, maxsize=64):
+        self.backend = backend
+        self.on_text = on_text
+        self.language = language
+        self.path = path
+        self.recognized = 0
+        self.unrecognized = 0
+        self.checked_in = 0  # recognized and accepted by on_text
+        self._counter_lock = threading.Lock()
+        self.errors = collections.deque(maxlen=20)
+        self.results = collections.deque(maxlen=50)
+        self._utterances = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, name="checkin-capture", daemon=True)
+        self._recognizer_threads = [
+            threading.Thread(target=self._recognize, name=f"checkin-recognize-{i}", daemon=True)
+            for i in range(recognizers)
+        ]
+
+    def start(self):
+        self._capture_thread.start()
+        for thread in self._recognizer_threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stop capturing; utterances already queued are still recognized."""
+        self._stop.set()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in [self._capture_thread] + self._recognizer_threads)
+
+    def wait(self, timeout=None):
+        """Wait for the source to run out (recorded files) and the queue to drain."""
+        self._capture_thread.join(timeout)
+        for thread in self._recognizer_threads:
+            thread.join(timeout)
+
+    def _capture(self):
+        try:
+            with self.backend.open_source(self.path) as source:
+                for audio in self.backend.capture(source, self._stop):
+                    self._utterances.put(audio)
+        except Exception as e:
+            logger.exception("Voice capture failed")
+            self.errors.append(str(e))
+        finally:
+            for _ in self._recognizer_threads:
+                self._utterances.put(None)
+
+    def _recognize(self):
+        while True:
+            audio = self._utterances.get()
+            if audio is None:
+                return
+            text = self.backend.recognize(audio, self.language, status=self.errors.append)
+            with self._counter_lock:
+                if text:
+                    self.recognized += 1
+                else:
+                    self.unrecognized += 1
+            if not text:
+                continue
+            try:
+                attendee = self.on_text(text)
+            except Exception as e:
+                logger.exception("Check-in failed for %r", text)
+                self.errors.append(str(e))
+                continue
+            if attendee:
+                with self._counter_lock:
+                    self.checked_in += 1
+            self.results.append((datetime.datetime.now(), text, attendee))
+
+@st.cache_resource
+def get_voice():
+    """Return the shared voice backend.
+
+    Set ATTENDANCE_VOICE=fake to force the silent backend; it is also used
+    automatically when the speech packages are not installed.
+    """
+    if os.environ.get("ATTENDANCE_VOICE") == "fake" or not SystemVoiceBackend.available():
+        return FakeVoiceBackend()
+    return SystemVoiceBackend()
+
+# Voice recognition with language support
+def listen(language="en-US"):
+    """Capture and recognize voice input with the specified language."""
+    return get_voice().listen(language, status=st.write)
+
 # Text-to-speech feedback
 def speak(text):
-    """Provide voice feedback using text-to-speech."""
-    engine.say(text)
-    engine.runAndWait()
+    """Queue voice feedback; it is spoken on the TTS worker thread."""
+    get_workers().tts.submit(text)
+
+# Daily attendance chart
+def plot_daily_counts(df):
+    """Return a bar chart figure of per-day attendance counts."""
+    from matplotlib.figure import Figure
+    fig = Figure()
+    ax = fig.subplots()
+    df.set_index('day')['count'].plot(kind='bar', ax=ax)
+    ax.set_title("Attendance by Date")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Count")
+    return fig
+
+# Roster name matching
+def normalize_name(text):
+    """Lower-case, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text.lower()).split())
+
+SOUNDEX_CODES = {ch: str(code) for code, letters in enumerate(
+    ["aehiouwy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for ch in letters}
+
+def soundex(word):
+    """Return the four-character Soundex code of one word."""
+    word = [ch for ch in word if ch in SOUNDEX_CODES]
+    if not word:
+        return ""
+    code, previous = word[0], SOUNDEX_CODES[word[0]]
+    for ch in word[1:]:
+        digit = SOUNDEX_CODES[ch]
+        if digit != "0" and digit != previous:
+            code += digit
+        if ch not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """In-memory roster index resolving recognized text to a canonical name.
+
+    An exact match on the normalized name wins outright. Otherwise every
+    roster name is ranked by how many trigrams it shares with the query,
+    and the ``max_candidates`` most similar, together with the closest
+    names that share the query's phonetic (Soundex per word) key, are
+    scored with difflib; the highest score above ``min_score`` wins.
+    Overlaps are counted with numpy over the full posting lists, so no
+    candidate is dropped just because it shares only common trigrams.
+    """
+
+    def __init__(self, names=(), min_score=0.75, max_candidates=50):
+        self.min_score = min_score
+        self.max_candidates = max_candidates
+        self._names = []
+        self._normalized = []
+        self._exact = {}
+        self._phonetic = collections.defaultdict(list)
+        self._trigrams = collections.defaultdict(list)
+        self._sizes = []
+        self._arrays = None
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        key = normalize_name(name)
+        if not key or key in self._exact:
+            return
+        i = len(self._names)
+        self._names.append(name)
+        self._normalized.append(key)
+        self._exact[key] = i
+        self._phonetic[self.phonetic_key(key)].append(i)
+        grams = trigrams(key)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._trigrams[gram].append(i)
+        self._arrays = None
+
+    @staticmethod
+    def phonetic_key(normalized):
+        return " ".join(soundex(word) for word in normalized.split())
+
+    def _best(self, key, candidates):
+        # SequenceMatcher caches its analysis of seq2, so the query goes there
+        matcher = difflib.SequenceMatcher(None, "", key)
+        best, best_score = None, self.min_score
+        for i in candidates:
+            matcher.set_seq1(self._normalized[i])
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = i, score
+        return best
+
+    def _posting_arrays(self):
+        # numpy copies of the posting lists, rebuilt after names are added
+        if self._arrays is None:
+            import numpy as np
+            self._arrays = (np, {gram: np.array(posting, dtype=np.int32) for gram, posting in self._trigrams.items()},
+                            np.array(self._sizes, dtype=np.float64))
+        return self._arrays
+
+    def candidates(self, key):
+        """Return the roster indexes worth scoring for a normalized query, most similar first."""
+        np, postings, sizes = self._posting_arrays()
+        grams = trigrams(key)
+        hits = [postings[gram] for gram in grams if gram in postings]
+        phonetic = np.array(self._phonetic.get(self.phonetic_key(key), ()), dtype=np.int64)
+        if not hits:
+            return phonetic[:self.max_candidates].tolist()
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self._names))
+        # Names sharing under half as many trigrams as the closest one are
+        # not worth scoring; the rest are ranked by Dice similarity, which
+        # does not favour long names the way a raw overlap count does
+        shared = np.flatnonzero(overlap >= (overlap.max() + 1) // 2)
+        similarity = overlap[shared] / (sizes[shared] + len(grams))
+        if len(shared) > self.max_candidates:
+            top = np.argpartition(similarity, -self.max_candidates)[-self.max_candidates:]
+        else:
+            top = np.arange(len(shared))
+        ranked = shared[top[np.argsort(-similarity[top], kind="stable")]]
+        if len(phonetic) > self.max_candidates:
+            closeness = overlap[phonetic] / (sizes[phonetic] + len(grams))
+            phonetic = phonetic[np.argsort(-closeness, kind="stable")[:self.max_candidates]]
+        return list(dict.fromkeys(itertools.chain(ranked.tolist(), phonetic.tolist())))
+
+    def match(self, text):
+        """Return the canonical roster name for ``text``, or None if nothing is close."""
+        key = normalize_name(text or "")
+        if not key:
+            return None
+        if key in self._exact:
+            return self._names[self._exact[key]]
+        best = self._best(key, self.candidates(key))
+        return self._names[best] if best is not None else None
+
+class DedupWindow:
+    """Remember recent (event, name) check-ins to skip repeats without a database query."""
+
+    def __init__(self, seconds=600.0):
+        self.seconds = seconds
+        self.skipped = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def seen(self, event, name, now=None):
+        """Return True if this attendee checked in to ``event`` within the window; else record it."""
+        now = time.monotonic() if now is None else now
+        key = (event, name)
+        with self._lock:
+            last = self._seen.get(key)
+            if last is not None and now - last < self.seconds:
+                self.skipped += 1
+                return True
+            self._seen[key] = now
+            if len(self._seen) > 10000:
+                # Drop expired entries so long-running servers stay bounded
+                self._seen = {k: t for k, t in self._seen.items() if now - t < self.seconds}
+            return False
+
+    def forget(self, event, name):
+        """Drop a recorded check-in, e.g. because storing it failed."""
+        with self._lock:
+            self._seen.pop((event, name), None)
+
+class AttendeeMatcher:
+    """Roster index plus duplicate window, shared by every check-in path.
+
+    The index is loaded from the attendees table on first use and reloaded
+    after the roster changes. With an empty roster, names pass through
+    unchanged.
+    """
+
+    def __init__(self, dedup_seconds=600.0):
+        self.dedup = DedupWindow(dedup_seconds)
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                with get_store().connection() as conn:
+                    rows = conn.execute("SELECT name FROM attendees").fetchall()
+                self._index = NameIndex(name for (name,) in rows)
+            return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def resolve(self, text):
+        index = self.index
+        if not len(index):
+            return text.strip() or None
+        return index.match(text)
+
+    def check_in(self, text, event):
+        """Resolve ``text`` and mark attendance unless it repeats within the window.
+
+        Returns the canonical name that was marked, or None. The duplicate
+        window claims the attendee before the insert, so concurrent
+        recognizers cannot both mark them, and releases the claim if the
+        insert fails so that a retry is not skipped.
+        """
+        name = self.resolve(text)
+        if name is None or self.dedup.seen(event, name):
+            return None
+        try:
+            mark_attendance(name, event)
+        except BaseException:
+            self.dedup.forget(event, name)
+            raise
+        return name
+
+@st.cache_resource
+def get_matcher():
+    """Return the matcher shared by all sessions; ATTENDANCE_DEDUP_SECONDS sets the window."""
+    return AttendeeMatcher(float(os.environ.get("ATTENDANCE_DEDUP_SECONDS", 600)))
+
+def add_attendees(names):
+    """Add names to the canonical roster; returns the number of new attendees."""
+    with get_store().transaction() as conn:
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO attendees (name) VALUES (?)",
+                         ((name.strip(),) for name in names if name and name.strip()))
+        added = conn.total_changes - before
+    get_matcher().invalidate()
+    return added
+
+# Check one attendee in, with voice and email feedback
+def check_in(text, event="General"):
+    """Resolve recognized text to a roster name and mark attendance once per window.
+
+    Returns the canonical name that was marked, or None when the text
+    matches nobody on the roster or the attendee was already checked in.
+    """
+    name = get_matcher().check_in(text, event)
+    if name is None:
+        return None
+    speak(f"Attendance marked for {name} in {event}.")
+    send_notification("user@example.com", f"Attendance marked for {name} at {datetime.datetime.now()}")
+    return name
+
+# Background workers for slow side effects
+class BackgroundWorker:
+    """Daemon thread that drains a bounded queue and hands items to ``handler`` in batches.
+
+    After the first item arrives the worker keeps collecting for up to
+    ``batch_window`` seconds (or ``batch_max`` items), so bursts are coalesced
+    into one handler call. Submitting never blocks: when the queue is full
+    the item is dropped and counted.
+    """
+
+    def __init__(self, name, handler, maxsize=256, batch_window=0.0, batch_max=100):
+        self.name = name
+        self.handler = handler
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._latencies = collections.deque(maxlen=500)
+        self._queue = queue.Queue(maxsize)
+        # Guards the counters; notified after every batch so join() can wait on it
+        self._done = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue an item; returns False if it was dropped because the queue is full."""
+        with self._done:
+            try:
+                self._queue.put_nowait((time.monotonic(), item))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self.submitted += 1
+            return True
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_max:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self.handler([item for _, item in batch])
+                ok = True
+            except Exception:
+                logger.exception("%s worker failed on a batch of %d", self.name, len(batch))
+                ok = False
+            done = time.monotonic()
+            with self._done:
+                if ok:
+                    self.completed += len(batch)
+                else:
+                    self.failed += len(batch)
+                self._latencies.extend(done - enqueued for enqueued, _ in batch)
+                self._done.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until every item submitted so far has been handled; False on timeout."""
+        with self._done:
+            return self._done.wait_for(lambda: self.completed + self.failed >= self.submitted, timeout)
+
+    def metrics(self):
+        """Return queue depth, counters and latency (enqueue to handled) in milliseconds."""
+        with self._done:
+            latencies = sorted(self._latencies)
+            counters = {"submitted": self.submitted, "completed": self.completed,
+                        "dropped": self.dropped, "failed": self.failed}
+        return {
+            "depth": self._queue.qsize(),
+            **counters,
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+# Email notification digests
+class DigestMailer:
+    """Send queued notifications as one digest per recipient over a reused SMTP connection.
+
+    Without an SMTP host the digests are only logged, matching the old
+    simulated behaviour.
+    """
+
+    def __init__(self, host=None, port=25, username=None, password=None,
+                 sender="attendance@localhost", starttls=False):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self.digests_sent = 0
+        self._smtp = None
+
+    @classmethod
+    def from_env(cls):
+        """Configure from ATTENDANCE_SMTP_* environment variables."""
+        env = os.environ
+        return cls(host=env.get("ATTENDANCE_SMTP_HOST"),
+                   port=int(env.get("ATTENDANCE_SMTP_PORT", 25)),
+                   username=env.get("ATTENDANCE_SMTP_USER"),
+                   password=env.get("ATTENDANCE_SMTP_PASSWORD"),
+                   sender=env.get("ATTENDANCE_SMTP_FROM", "attendance@localhost"),
+                   starttls=env.get("ATTENDANCE_SMTP_STARTTLS") == "1")
+
+    def _connection(self):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=10)
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _send(self, msg):
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server dropped the idle connection; reconnect once
+            self._smtp = None
+            self._connection().send_message(msg)
+
+    def send(self, notifications):
+        """Send a batch of (to_email, message) pairs, one digest per recipient."""
+        by_recipient = collections.OrderedDict()
+        for to_email, message in notifications:
+            by_recipient.setdefault(to_email, []).append(message)
+        for to_email, messages in by_recipient.items():
+            if not self.host:
+                logger.info("Simulated digest to %s: %s", to_email, "; ".join(messages))
+                self.digests_sent += 1
+                continue
+            msg = MIMEText("\n".join(messages))
+            msg["Subject"] = f"Attendance digest ({len(messages)} updates)"
+            msg["From"] = self.sender
+            msg["To"] = to_email
+            self._send(msg)
+            self.digests_sent += 1
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+@st.cache_resource
+def get_workers():
+    """Start the shared TTS and notification workers.
+
+    Notifications are coalesced for ATTENDANCE_DIGEST_SECONDS (default 30)
+    before each digest goes out.
+    """
+    voice = get_voice()
+    mailer = DigestMailer.from_env()
+    digest_window = float(os.environ.get("ATTENDANCE_DIGEST_SECONDS", 30))
+    return types.SimpleNamespace(
+        tts=BackgroundWorker("tts", lambda texts: [voice.speak(text) for text in texts], maxsize=64),
+        notifications=BackgroundWorker("notifications", mailer.send, maxsize=1024,
+                                       batch_window=digest_window, batch_max=500),
+        mailer=mailer,
+    )
 
-# Simulated email notification (placeholder)
 def send_notification(to_email, message):
-    """Simulate sending an email notification (replace with actual SMTP setup)."""
-    st.write(f"Simulated email sent to {to_email}: {message}")
+    """Queue an email notification for the next digest; returns False if the queue is full."""
+    return get_workers().notifications.submit((to_email, message))
+
+@st.fragment(run_every=1)
+def show_checkin_session(session):
+    """Refresh the live check-in list every second without rerunning the page."""
+    st.write(f"Checked in: {session.checked_in} · Recognized: {session.recognized} · "
+             f"Not understood: {session.unrecognized}")
+    for when, heard, attendee in reversed(session.results):
+        if attendee is None:
+            st.write(f"{when:%H:%M:%S} {heard} (skipped: unknown or already checked in)")
+        else:
+            st.write(f"{when:%H:%M:%S} {attendee}" + (f" (heard '{heard}')" if heard != attendee.lower() else ""))
+    for error in session.errors:
+        st.caption(error)
 
 # Main Streamlit UI
 def main():
@@ -175,13 +1353,12 @@ def main():
         with col1:
             if st.button("Start Voice Recognition"):
                 name = listen(language)
-                if name and mark_attendance(name, event):
-                    speak(f"Attendance marked for {name} in {event}.")
-                    st.success(f"Attendance marked for {name} in {event}.")
-                    send_notification("user@example.com", f"Attendance marked for {name} at {datetime.datetime.now()}")
+                attendee = check_in(name, event) if name else None
+                if attendee:
+                    st.success(f"Attendance marked for {attendee} in {event}.")
                 else:
                     speak("Error marking attendance.")
-                    st.error("Error or unrecognized input.")
+                    st.error("Unrecognized input, not on the roster, or already checked in.")
         
         with col2:
             manual_name = st.text_input("Manual Entry Name")
@@ -192,29 +1369,61 @@ def main():
                 else:
                     st.error("Error marking attendance.")
 
+        st.subheader("Continuous Check-in")
+        session = st.session_state.get('checkin_session')
+        if session is None or not session.running:
+            if st.button("Start Continuous Check-in"):
+                st.session_state.checkin_session = CheckInSession(
+                    get_voice(), functools.partial(check_in, event=event), language).start()
+                st.rerun()
+        else:
+            if st.button("Stop Continuous Check-in"):
+                session.stop()
+            show_checkin_session(session)
+
+        st.subheader("Import Roster")
+        roster_file = st.file_uploader("CSV with a name column (event/timestamp optional)", type="csv")
+        if roster_file is not None and st.button("Import Roster"):
+            rejected = []
+            count = import_roster(roster_file, event, rejected)
+            st.success(f"Attendance marked for {count} attendees in {event}.")
+            if rejected:
+                st.warning(f"Skipped {len(rejected)} rows with unreadable timestamps, e.g. "
+                           + ", ".join(repr(row[2]) for row in rejected[:3]))
+
     # Reports Tab
     with tab2:
         st.header("Attendance Reports")
         report_name = st.text_input("Enter name to filter (leave blank for all):")
         report_event = st.text_input("Enter event to filter (leave blank for all):")
+        date_col1, date_col2 = st.columns(2)
+        report_start = date_col1.date_input("From date (optional)", value=None)
+        report_end = date_col2.date_input("To date (optional)", value=None)
         if st.button("Generate Report"):
-            df = get_attendance_data(report_name, report_event)
+            st.session_state.report_filter = (report_name, report_event, report_start, report_end)
+            st.session_state.report_cursors = [None]
+        if 'report_filter' in st.session_state:
+            report_filter = st.session_state.report_filter
+            cursors = st.session_state.report_cursors
+            df, next_cursor = get_attendance_page(*report_filter, after=cursors[-1])
             st.dataframe(df)
+            st.caption(f"Page {len(cursors)}")
+            prev_col, next_col = st.columns(2)
+            prev_col.button("Previous Page", disabled=len(cursors) == 1,
+                            on_click=lambda: cursors.pop())
+            next_col.button("Next Page", disabled=next_cursor is None,
+                            on_click=lambda: cursors.append(next_cursor))
             if not df.empty:
-                st.download_button("Download CSV", df.to_csv(index=False), "attendance_report.csv")
+                # A callable defers building the file until the button is clicked
+                st.download_button("Download CSV", functools.partial(attendance_csv_file, *report_filter),
+                                   "attendance_report.csv")
 
     # Analytics Tab
     with tab3:
         st.header("Attendance Analytics")
-        df = get_attendance_data()
+        df = get_daily_counts()
         if not df.empty:
-            fig, ax = plt.subplots()
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.groupby(df['timestamp'].dt.date)['name'].count().plot(kind='bar', ax=ax)
-            ax.set_title("Attendance by Date")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Count")
-            st.pyplot(fig)
+            st.pyplot(plot_daily_counts(df))
         else:
             st.write("No data available for analytics.")
 
@@ -227,11 +1436,114 @@ def main():
             new_password = st.text_input("New Password", type="password")
             if st.button("Add User"):
                 add_user(new_username, new_password)
-        
+
+            st.subheader("Attendee Roster")
+            st.caption(f"{len(get_matcher().index)} attendees; voice check-ins are matched against this list.")
+            attendee_file = st.file_uploader("CSV with a name column", type="csv", key="attendee_roster")
+            if attendee_file is not None and st.button("Add Attendees"):
+                reader = io.TextIOWrapper(attendee_file, encoding="utf-8", newline="")
+                added = add_attendees(row[0] for row in read_roster(reader))
+                st.success(f"Added {added} attendees to the roster.")
+
+        st.subheader("Query Cache")
+        stats = get_store().cache.stats()
+        hits_col, misses_col, rate_col = st.columns(3)
+        hits_col.metric("Hits", stats["hits"])
+        misses_col.metric("Misses", stats["misses"])
+        rate_col.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        st.caption(f"{stats['size']} of {stats['maxsize']} entries, data version {get_store().version()}")
+
+        st.subheader("Background Workers")
+        workers = get_workers()
+        for worker in (workers.tts, workers.notifications):
+            metrics = worker.metrics()
+            depth_col, done_col, p50_col, max_col = st.columns(4)
+            depth_col.metric(f"{worker.name} queue", metrics["depth"])
+            done_col.metric("Completed", metrics["completed"], help=f"{metrics['dropped']} dropped, {metrics['failed']} failed")
+            p50_col.metric("p50 latency", f"{metrics['p50_ms']:.0f} ms")
+            max_col.metric("Max latency", f"{metrics['max_ms']:.0f} ms")
+        st.caption(f"{workers.mailer.digests_sent} notification digests sent")
+
         if st.button("Logout"):
             st.session_state.authenticated = False
             st.session_state.username = None
             st.success("Logged out successfully.")
 
+# Command-line entry point
+def cli(argv):
+    """Run headless commands, e.g. ``python smart_attendance.py import roster.csv``."""
+    global DB_PATH
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    parser = argparse.ArgumentParser(prog="smart_attendance.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", parents=[common], help="Bulk-import attendance from CSV files")
+    import_parser.add_argument("files", nargs="+", help="CSV files ('-' for stdin)")
+    import_parser.add_argument("--event", default="General", help="Event for rows without one")
+    commands.add_parser("rebuild-rollups", parents=[common], help="Recompute the analytics rollup table")
+    roster_parser = commands.add_parser("roster", parents=[common], help="Add attendees to the canonical roster")
+    roster_parser.add_argument("files", nargs="+", help="CSV files with a name column ('-' for stdin)")
+    checkin_parser = commands.add_parser("checkin", parents=[common], help="Continuous voice check-in")
+    checkin_parser.add_argument("--event", default="General", help="Event to check attendees into")
+    checkin_parser.add_argument("--language", default="en-US", help="Recognition language")
+    checkin_parser.add_argument("--wav", nargs="+", help="Replay recorded WAV files instead of the microphone")
+    export_parser = commands.add_parser("export", parents=[common], help="Export a filtered attendance report")
+    export_parser.add_argument("output", help="Output file path")
+    export_parser.add_argument("--name", help="Only rows for this name")
+    export_parser.add_argument("--event", help="Only rows for this event")
+    export_parser.add_argument("--start", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD)")
+    export_parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    export_parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format")
+    args = parser.parse_args(argv)
+
+    DB_PATH = args.db
+    init_db()
+    if args.command == "import":
+        for path in args.files:
+            rejected = []
+            if path == "-":
+                count = mark_attendance_many(read_roster(sys.stdin), args.event, rejected)
+            else:
+                with open(path, newline="", encoding="utf-8") as f:
+                    count = mark_attendance_many(read_roster(f), args.event, rejected)
+            print(f"{path}: {count} rows imported")
+            for row in rejected:
+                print(f"{path}: skipped {row[0]!r}, bad timestamp {row[2]!r}", file=sys.stderr)
+    elif args.command == "rebuild-rollups":
+        rebuild_rollups()
+        print("Rollups rebuilt")
+    elif args.command == "roster":
+        for path in args.files:
+            f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+            with f:
+                added = add_attendees(row[0] for row in read_roster(f))
+            print(f"{path}: {added} attendees added")
+    elif args.command == "checkin":
+        voice = get_voice()
+        if isinstance(voice, FakeVoiceBackend):
+            parser.error("voice check-in is disabled by ATTENDANCE_VOICE=fake" if SystemVoiceBackend.available()
+                         else "voice check-in needs the SpeechRecognition package")
+        matcher = get_matcher()
+
+        def on_text(text):
+            name = matcher.check_in(text, args.event)
+            print(f"{datetime.datetime.now():%H:%M:%S} {name or text + ' (skipped)'}")
+            return name
+        for path in args.wav or [None]:
+            session = CheckInSession(voice, on_text, args.language, path=path).start()
+            try:
+                session.wait()
+            except KeyboardInterrupt:
+                session.stop()
+                session.wait()
+            print(f"{path or 'microphone'}: {session.checked_in} checked in, "
+                  f"{session.recognized - session.checked_in} skipped, {session.unrecognized} not understood")
+    elif args.command == "export":
+        count = export_attendance(args.output, args.name, args.event, args.start, args.end, args.format)
+        print(f"{args.output}: {count} rows exported")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_attendance as sa
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh, migrated attendance database in a temporary directory."""
+    store = sa.AttendanceStore(str(tmp_path / "attendance.db"))
+    monkeypatch.setattr(sa, "get_store", lambda: store)
+    monkeypatch.setattr(sa, "DB_PATH", store.path)
+    sa.init_db()
+    yield store
+    store.close()
@@ -0,0 +1,353 @@
+import csv
+import http.server
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import currency_converter as cc
+
+RATES = {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "JPY": 150.0}
+
+
+class RatesServer(http.server.ThreadingHTTPServer):
+    """Local stand-in for the rates API; holds responses until ``release`` is set."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RatesHandler)
+        self.requests = []
+        self.release = threading.Event()
+        self.release.set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/latest/{{base}}"
+
+
+class RatesHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address))
+        self.server.release.wait(5)
+        body = json.dumps({"base": self.path.rsplit("/", 1)[-1], "rates": RATES}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def rates_server():
+    server = RatesServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher_reuses_its_connection(rates_server):
+    fetcher = cc.RateFetcher(rates_server.url)
+    assert fetcher("USD") == RATES
+    assert fetcher("EUR") == RATES
+    fetcher.close()
+    assert [path for path, _ in rates_server.requests] == ["/latest/USD", "/latest/EUR"]
+    assert len({client for _, client in rates_server.requests}) == 1
+
+
+def test_concurrent_snapshots_share_one_fetch(rates_server):
+    cache = cc.RateCache(cc.RateFetcher(rates_server.url))
+    rates_server.release.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [cache.snapshot_async(executor) for _ in range(5)]
+        assert len(set(futures)) == 1
+        rates_server.release.set()
+        snapshot = futures[0].result(timeout=5)
+        assert cache.snapshot_async(executor).result() is snapshot
+    cache.fetcher.close()
+    assert len(rates_server.requests) == 1
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+def test_closing_the_window_stops_background_work(rates_server, monkeypatch):
+    class Master:
+        destroyed = False
+
+        def destroy(self):
+            self.destroyed = True
+
+    app = cc.EnhancedCurrencyConverter.__new__(cc.EnhancedCurrencyConverter)
+    app.master = Master()
+    app.executor = ThreadPoolExecutor(max_workers=1)
+    app.rate_cache = cc.RateCache(cc.RateFetcher(rates_server.url))
+    closed = []
+    monkeypatch.setattr(app.rate_cache.fetcher.session, "close", lambda: closed.append(True))
+    rates_server.release.clear()
+    running = app.rate_cache.snapshot_async(app.executor, "USD")
+    queued = app.rate_cache.snapshot_async(app.executor, "EUR")
+    app.close()
+    rates_server.release.set()
+
+    assert app.master.destroyed
+    assert queued.cancelled()
+    assert closed
+    with pytest.raises(RuntimeError):
+        app.executor.submit(print)
+    running.exception(timeout=5)
+
+
+def test_convert_csv_counts_blank_and_short_rows():
+    engine = cc.ConversionEngine(cc.RateSnapshot("USD", RATES))
+    infile = io.StringIO("amount,from,to\n\n100,USD,EUR\n,,\n50,GBP\n25,EUR,JPY\n")
+    outfile = io.StringIO()
+    assert cc.convert_csv(engine, infile, outfile) == (3, 1)
+    assert list(csv.reader(io.StringIO(outfile.getvalue()))) == [
+        ["amount", "from", "to", "converted"],
+        ["100", "USD", "EUR", "90.00"],
+        ["50", "GBP", "", ""],
+        ["25", "EUR", "JPY", "4166.67"],
+    ]
+    assert cc.convert_csv(engine, io.StringIO("\n\n"), io.StringIO()) == (0, 0)
+
+
+@pytest.fixture
+def saved_rates(tmp_path):
+    path = str(tmp_path / "rates.json")
+    cc.save_snapshot(cc.RateSnapshot("USD", RATES), path)
+    return path
+
+
+def test_cli_converts_with_saved_rates(tmp_path, saved_rates, capsys):
+    source = tmp_path / "in.csv"
+    source.write_text("\nprice,currency\n10,EUR\n")
+    target = tmp_path / "out.csv"
+    cc.cli(["convert", str(source), "-o", str(target), "--rates", saved_rates,
+            "--amount-col", "price", "--from-col", "currency", "--to", "USD"])
+    assert target.read_text().splitlines() == ["price,currency,converted", "10,EUR,11.11"]
+    assert "1 rows converted, 0 invalid" in capsys.readouterr().err
+
+
+def test_cli_names_a_missing_column(tmp_path, saved_rates, capsys):
+    source = tmp_path / "in.csv"
+    source.write_text("price,currency\n10,EUR\n")
+    target = tmp_path / "out.csv"
+    with pytest.raises(SystemExit) as exit:
+        cc.cli(["convert", str(source), "-o", str(target), "--rates", saved_rates, "--to", "USD"])
+    assert exit.value.code == 2
+    err = capsys.readouterr().err
+    assert "column 'amount' not found" in err
+    assert "its columns are: price, currency" in err
+    assert not target.exists()
+
+
+def test_failing_listener_does_not_fail_the_fetch():
+    cache = cc.RateCache(lambda base: RATES)
+    seen = []
+
+    def broken(snapshot):
+        raise OSError("disk full")
+    cache.listeners += [broken, seen.append]
+    snapshot = cache.snapshot()
+    assert snapshot.rates == RATES
+    assert seen == [snapshot]
+
+
+def test_history_rebases_and_fills_new_currencies(tmp_path):
+    history = cc.RateHistory(str(tmp_path))
+    history.append(cc.RateSnapshot("USD", {"USD": 1.0, "EUR": 0.9}, fetched_at=100))
+    history.append(cc.RateSnapshot("EUR", {"EUR": 1.0, "USD": 1.25, "GBP": 1.0}, fetched_at=200))
+    history.append(cc.RateSnapshot("USD", {"USD": 1.0, "EUR": 0.7}, fetched_at=150))  # out of order
+    history.append(cc.RateSnapshot("JPY", {"JPY": 1.0}, fetched_at=300))  # no USD rate to rebase with
+    assert history.currencies() == ["EUR", "GBP", "USD"]
+    times, rates = history.query("USD", "EUR")
+    assert times.tolist() == [100, 200]
+    assert rates == pytest.approx([0.9, 0.8])
+    times, rates = history.query("USD", "GBP")
+    assert times.tolist() == [200]
+    assert rates == pytest.approx([0.8])
+
+
+def test_history_drops_a_torn_append(tmp_path):
+    history = cc.RateHistory(str(tmp_path))
+    history.append(cc.RateSnapshot("USD", {"USD": 1.0, "EUR": 0.9}, fetched_at=100))
+    # A crash after writing the EUR column but before the time column
+    with open(history._file("EUR"), "ab") as f:
+        f.write(np.array([0.5], dtype="<f8").tobytes())
+    assert history.query("USD", "EUR")[1] == pytest.approx([0.9])
+    history.append(cc.RateSnapshot("USD", {"USD": 1.0, "EUR": 0.8}, fetched_at=200))
+    times, rates = history.query("USD", "EUR")
+    assert times.tolist() == [100, 200]
+    assert rates == pytest.approx([0.9, 0.8])
+
+
+def test_history_downsampling_keeps_spikes(tmp_path):
+    history = cc.RateHistory(str(tmp_path))
+    for i in range(1000):
+        history.append(cc.RateSnapshot("USD", {"USD": 1.0, "EUR": 5.0 if i == 437 else 1.0}, fetched_at=i))
+    times, rates = history.query("USD", "EUR", max_points=100)
+    assert len(times) == len(rates) == 100
+    assert rates.max() == 5.0
+    assert times[0] >= 0 and times[-1] <= 999
+    times, rates = history.query("USD", "EUR", start=400, end=449)
+    assert times.tolist() == list(range(400, 450))
+
+
+def usd_eur(rate, fetched_at=None):
+    return cc.RateSnapshot("USD", {"USD": 1.0, "EUR": rate}, fetched_at)
+
+
+def test_threshold_alerts_fire_once():
+    engine = cc.AlertEngine()
+    engine.add("USD", "EUR", "above", 0.95)
+    engine.add("USD", "EUR", "below", 0.85)
+    assert engine.evaluate(usd_eur(0.9)) == []
+    assert engine.evaluate(usd_eur(0.95)) == ["Alert: USD/EUR is above 0.95 at 0.9500"]
+    assert engine.evaluate(usd_eur(0.97)) == []
+    assert engine.evaluate(usd_eur(0.8)) == ["Alert: USD/EUR is below 0.85 at 0.8000"]
+    assert engine.list_rules() == []
+    assert engine.triggered.qsize() == 2
+
+
+def test_move_alert_rearms_around_the_rate_it_fired_at():
+    engine = cc.AlertEngine()
+    rule = engine.add("USD", "EUR", "move", 0.1)
+    assert engine.evaluate(usd_eur(1.0)) == []  # arms around 1.0
+    assert engine.evaluate(usd_eur(1.05)) == []
+    assert engine.evaluate(usd_eur(1.1)) == ["Alert: USD/EUR moved +10.00% to 1.1000"]
+    assert rule.reference == 1.1
+    assert engine.evaluate(usd_eur(1.0)) == []
+    assert len(engine.evaluate(usd_eur(0.99))) == 1
+    assert engine.list_rules() == [rule]
+
+
+@pytest.mark.parametrize("kind, value", [("move", 0), ("move", -0.05), ("above", 0), ("below", -1),
+                                         ("above", float("nan")), ("sideways", 1)])
+def test_invalid_rules_are_rejected(kind, value):
+    engine = cc.AlertEngine()
+    with pytest.raises(ValueError):
+        engine.add("USD", "EUR", kind, value)
+    assert engine.list_rules() == []
+
+
+def test_rules_can_be_listed_while_alerts_fire():
+    engine = cc.AlertEngine()
+    stop = threading.Event()
+
+    def fire():
+        while not stop.is_set():
+            for i in range(50):
+                engine.add("USD", "EUR", "above", 0.5 + i / 100)
+            engine.evaluate(usd_eur(2.0))
+    thread = threading.Thread(target=fire)
+    thread.start()
+    try:
+        for _ in range(2000):
+            assert all(rule.kind == "above" for rule in engine.list_rules())
+    finally:
+        stop.set()
+        thread.join()
+
+
+class StubMaster:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+
+def alert_app(fetcher):
+    app = cc.EnhancedCurrencyConverter.__new__(cc.EnhancedCurrencyConverter)
+    app.master = StubMaster()
+    app.executor = ThreadPoolExecutor(max_workers=1)
+    app.results = cc.queue.Queue()
+    app.pending = 0
+    app.rate_cache = cc.RateCache(fetcher)
+    app.alert_engine = cc.AlertEngine()
+    app.alert_engine.add("USD", "EUR", "above", 2.0)
+    app.alert_retry_seconds = 60
+    app.last_alert_poll = 0.0
+    return app
+
+
+def test_alert_polls_fetch_only_once_the_cache_expires():
+    calls = []
+    app = alert_app(lambda base: calls.append(base) or {"USD": 1.0, "EUR": 0.9})
+    app.rate_cache.store(usd_eur(0.9))
+    for _ in range(100):
+        app.poll_alerts()
+    assert (app.rate_cache.hits, app.rate_cache.misses, calls) == (0, 0, [])
+
+    app.rate_cache.store(usd_eur(0.9, fetched_at=cc.time.time() - app.rate_cache.ttl))
+    app.poll_alerts()
+    app.executor.shutdown(wait=True)
+    assert (app.rate_cache.hits, app.rate_cache.misses, calls) == (0, 1, ["USD"])
+    for _ in range(10):
+        app.poll_alerts()  # fresh again: no more fetches
+    assert calls == ["USD"]
+
+
+def test_failed_alert_refresh_is_not_retried_every_second():
+    def offline(base):
+        raise cc.requests.ConnectionError("offline")
+    app = alert_app(offline)
+    app.poll_alerts()
+    app.executor.shutdown(wait=True)
+    for _ in range(10):
+        app.poll_alerts()
+    assert app.rate_cache.misses == 1
+
+
+class Field:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def converter_app(fetcher):
+    app = alert_app(fetcher)
+    app.amount, app.from_currency, app.to_currency = Field("100"), Field("USD"), Field("EUR")
+    app.converted, app.loaded = [], []
+    app.finish_conversion = lambda amount, from_curr, to_curr, snapshot: app.converted.append(
+        (amount, from_curr, to_curr, snapshot.cross_rate(from_curr, to_curr)))
+    app.on_currencies_loaded = app.loaded.append
+    app.on_currencies_failed = lambda error: None
+    return app
+
+
+def test_stale_rates_convert_at_once_and_refresh_in_background():
+    release = threading.Event()
+    calls = []
+
+    def slow(base):
+        calls.append(base)
+        release.wait(5)
+        return {"USD": 1.0, "EUR": 0.8}
+    app = converter_app(slow)
+    app.rate_cache.store(usd_eur(0.9, fetched_at=cc.time.time() - 3600))
+    app.convert()
+    app.convert()
+    assert app.converted == [(100.0, "USD", "EUR", 0.9)] * 2
+    release.set()
+    app.executor.shutdown(wait=True)
+    assert calls == ["USD"]  # both conversions share one refresh
+    app.process_results()
+    assert [snapshot.rates["EUR"] for snapshot in app.loaded] == [0.8, 0.8]
+    app.convert()  # fresh now: answered from the cache
+    app.process_results()
+    assert app.converted[-1] == (100.0, "USD", "EUR", 0.8)
+    assert calls == ["USD"]
+
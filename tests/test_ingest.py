@@ -0,0 +1,39 @@
+import datetime
+
+import smart_attendance as sa
+
+
+def rollup(store):
+    with store.connection() as conn:
+        return sorted(conn.execute("SELECT day, hour, event, count FROM attendance_rollup").fetchall())
+
+
+def test_unparseable_timestamps_are_rejected(store):
+    roster = "name,event,timestamp\n" + "".join(f"bad {i},Lecture,garbage\n" for i in range(3))
+    roster += "".join(f"good {i},Lecture,2026-01-0{i + 1}T10:00:00\n" for i in range(5))
+    rejected = []
+    assert sa.import_roster(roster.encode(), rejected=rejected) == 5
+    assert [row[0] for row in rejected] == ["bad 0", "bad 1", "bad 2"]
+
+    first, cursor = sa.get_attendance_page(limit=3)
+    second, last = sa.get_attendance_page(after=cursor, limit=3)
+    assert list(first.name) + list(second.name) == [f"good {i}" for i in range(5)]
+    assert last is None
+    assert first.timestamp[0] == "2026-01-01 10:00:00"
+
+    counts = rollup(store)
+    sa.rebuild_rollups()
+    assert rollup(store) == counts
+
+
+def test_date_objects_and_other_types(store):
+    rejected = []
+    records = [
+        ("alice", "Lecture", datetime.datetime(2026, 3, 1, 9, 30)),
+        ("bob", "Lecture", datetime.date(2026, 3, 2)),
+        ("carol", "Lecture", 1767225600),
+    ]
+    assert sa.mark_attendance_many(records, rejected=rejected) == 2
+    assert rejected == [records[2]]
+    data = sa.get_attendance_data(event="Lecture")
+    assert list(data.timestamp) == ["2026-03-01 09:30:00", "2026-03-02 00:00:00"]
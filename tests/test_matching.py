@@ -0,0 +1,92 @@
+import difflib
+import random
+import sqlite3
+
+import pytest
+
+import smart_attendance as sa
+
+pytest.importorskip("numpy")
+
+FIRST_NAMES = ["james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "william",
+               "elizabeth", "david", "barbara", "priya", "rahul", "wei", "mohammed", "fatima", "maria",
+               "jose", "ana", "kenji", "yuki", "olga", "ivan", "sofia", "lucas", "emma", "noah"]
+SYLLABLES = ["ka", "ri", "to", "na", "shi", "ma", "ro", "le", "van", "der", "son", "berg", "ton", "ley",
+             "chen", "pa", "tel", "gar", "cia", "mor", "ris", "ne", "ill", "wat", "kin", "row", "sen"]
+
+
+def make_roster(rng, size):
+    """Synthetic roster where, as in real ones, first names repeat heavily."""
+    names = set()
+    while len(names) < size:
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.add(f"{rng.choice(FIRST_NAMES)} {surname}")
+    return sorted(names)
+
+
+def one_typo(rng, text):
+    i = rng.randrange(len(text) - 1)
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return rng.choice([
+        text[:i] + letter + text[i + 1:],
+        text[:i] + letter + text[i:],
+        text[:i] + text[i + 1:],
+        text[:i] + text[i + 1] + text[i] + text[i + 2:],
+    ])
+
+
+def best_score(query, names, min_score):
+    """Brute force: the highest difflib ratio over the whole roster."""
+    matcher = difflib.SequenceMatcher(None, "", query)
+    best = None
+    for name in names:
+        matcher.set_seq1(name)
+        # Both quick ratios are upper bounds, so skipping on them never loses the maximum
+        floor = min_score if best is None else best
+        if matcher.real_quick_ratio() >= floor and matcher.quick_ratio() >= floor:
+            best = max(best or 0.0, matcher.ratio())
+    return best if best is not None and best >= min_score else None
+
+
+def test_fuzzy_matches_are_as_good_as_brute_force():
+    rng = random.Random(7)
+    roster = make_roster(rng, 5000)
+    index = sa.NameIndex(roster)
+    worse, correct = [], 0
+    for _ in range(150):
+        name = rng.choice(roster)
+        query = one_typo(rng, name)
+        found = index.match(query)
+        expected = best_score(query, roster, index.min_score)
+        got = difflib.SequenceMatcher(None, found, query).ratio() if found else None
+        if expected is not None and (got is None or got < expected):
+            worse.append((query, found))
+        correct += found == name
+    assert not worse
+    assert correct >= 135
+
+
+def test_exact_and_normalized_lookups():
+    index = sa.NameIndex(["José Álvarez", "Mary O'Neil"])
+    assert index.match("jose alvarez") == "José Álvarez"
+    assert index.match("  MARY  o neil ") == "Mary O'Neil"
+    assert index.match("completely different") is None
+    assert index.match("") is None
+
+
+def test_failed_insert_does_not_block_retry(store, monkeypatch):
+    matcher = sa.AttendeeMatcher()
+    monkeypatch.setattr(sa, "get_matcher", lambda: matcher)
+    sa.add_attendees(["Alice Smith"])
+    mark_attendance = sa.mark_attendance
+
+    def locked(name, event="General"):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(sa, "mark_attendance", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        matcher.check_in("alice smith", "Lecture")
+
+    monkeypatch.setattr(sa, "mark_attendance", mark_attendance)
+    assert matcher.check_in("alice smyth", "Lecture") == "Alice Smith"
+    assert matcher.check_in("alice smith", "Lecture") is None
+    assert len(sa.get_attendance_data(event="Lecture")) == 1
@@ -0,0 +1,31 @@
+import threading
+
+import smart_attendance as sa
+
+
+def test_short_lived_threads_share_the_pool(store):
+    def rerun():
+        sa.mark_attendance("alice", "Lecture")
+        sa.get_attendance_page()
+    for _ in range(50):
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+    assert store.opened <= store.pool_size + 1  # the pool plus the data_version watcher
+    assert len(sa.get_attendance_data(event="Lecture")) == 50
+
+
+def test_streaming_rows_use_their_own_connection(store):
+    sa.mark_attendance_many(f"attendee {i}" for i in range(10))
+    with store.connection() as outer:
+        rows = sa.iter_attendance_rows(batch_size=3)
+        assert len(next(rows)) == 3
+        with store.connection() as inner:
+            assert inner is outer
+        # Closing the generator elsewhere must not touch this thread's checkout
+        closer = threading.Thread(target=rows.close)
+        closer.start()
+        closer.join()
+        with store.connection() as inner:
+            assert inner is outer
+    assert sum(len(batch) for batch in sa.iter_attendance_rows(batch_size=4)) == 10
@@ -0,0 +1,109 @@
+import itertools
+import math
+import struct
+import threading
+import wave
+
+import pytest
+
+import smart_attendance as sa
+
+RATE = 16000
+# Tone bursts standing in for spoken names; the first starts almost at once
+BURSTS = (440, 550, 660)
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A short WAV file with one utterance per entry in BURSTS."""
+    pytest.importorskip("speech_recognition")
+    samples = [0] * int(RATE * 0.3)
+    for freq in BURSTS:
+        samples.extend(int(12000 * math.sin(2 * math.pi * freq * i / RATE)) for i in range(int(RATE * 0.6)))
+        samples.extend([0] * int(RATE * 2.0))
+    path = tmp_path / "checkin.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return str(path)
+
+
+@pytest.fixture
+def scripted_recognition(monkeypatch):
+    """Replace the online recognizer with one that names utterances in order."""
+    names = (f"attendee {i}" for i in itertools.count(1))
+    lock = threading.Lock()
+
+    def recognize(self, audio, language="en-US", status=print):
+        with lock:
+            return next(names)
+    monkeypatch.setattr(sa.SystemVoiceBackend, "recognize", recognize)
+
+
+def test_recorded_file_keeps_first_utterance(recording):
+    backend = sa.SystemVoiceBackend()
+    with backend.open_source(recording) as source:
+        utterances = list(backend.capture(source, threading.Event()))
+    assert len(utterances) == len(BURSTS)
+    assert backend._calibrated_at is None
+
+
+def test_session_replays_every_utterance(recording, scripted_recognition):
+    heard = []
+    session = sa.CheckInSession(sa.SystemVoiceBackend(), heard.append, path=recording, recognizers=2).start()
+    session.wait()
+    assert sorted(heard) == ["attendee 1", "attendee 2", "attendee 3"]
+    assert session.recognized == len(BURSTS)
+    assert not session.errors
+
+
+def test_skipped_names_are_not_counted_as_checked_in(recording, scripted_recognition):
+    session = sa.CheckInSession(sa.SystemVoiceBackend(), lambda text: None if text == "attendee 2" else text,
+                                path=recording).start()
+    session.wait()
+    assert session.recognized == 3
+    assert session.checked_in == 2
+
+
+def test_checkin_cli_replays_wav(store, recording, scripted_recognition, capsys):
+    sa.cli(["checkin", "--db", store.path, "--event", "Lecture", "--wav", recording])
+    assert f"{recording}: 3 checked in" in capsys.readouterr().out
+    assert len(sa.get_attendance_data(event="Lecture")) == 3
+
+
+def test_recognition_does_not_need_tts(monkeypatch):
+    pytest.importorskip("speech_recognition")
+    find_spec = sa.importlib.util.find_spec
+    monkeypatch.setattr(sa.importlib.util, "find_spec",
+                        lambda name, *args: None if name == "pyttsx3" else find_spec(name, *args))
+    monkeypatch.setitem(sa.sys.modules, "pyttsx3", None)
+    backend = sa.SystemVoiceBackend()
+    assert backend.available()
+    assert backend.tts is False
+    backend.speak("ignored")
+
+
+def test_incomplete_backend_fails_at_construction():
+    class SilentBackend(sa.VoiceBackend):
+        def speak(self, text):
+            pass
+
+    with pytest.raises(TypeError):
+        SilentBackend()
+    sa.FakeVoiceBackend()
+
+
+def test_listen_reports_silence(monkeypatch):
+    sr = pytest.importorskip("speech_recognition")
+    backend = sa.SystemVoiceBackend()
+
+    def silent(source, timeout=None, phrase_time_limit=None):
+        raise sr.WaitTimeoutError("listening timed out")
+    monkeypatch.setattr(backend.recognizer, "listen", silent)
+    monkeypatch.setattr(backend, "open_source", lambda path=None: sa.contextlib.nullcontext())
+    monkeypatch.setattr(backend, "calibrate", lambda source, force=False: False)
+    messages = []
+    assert backend.listen(status=messages.append) is None
+    assert messages[-1] == "No speech detected"
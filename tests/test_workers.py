@@ -0,0 +1,113 @@
+import email
+import socket
+import socketserver
+import threading
+
+import pytest
+
+import smart_attendance as sa
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server to accept messages and count connections."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.open = []
+        self.lock = threading.Lock()
+
+    def drop_connections(self):
+        """Close every client connection, as an idle-timeout on a real server would."""
+        with self.lock:
+            for handler in self.open:
+                handler.connection.shutdown(socket.SHUT_RDWR)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open.append(self)
+        self.reply("220 stub ready")
+        try:
+            for raw in self.rfile:
+                command = raw.decode().strip().upper()
+                if command.startswith("EHLO"):
+                    self.reply("250-stub")
+                    self.reply("250 8BITMIME")
+                elif command.startswith("DATA"):
+                    self.reply("354 end with .")
+                    lines = []
+                    for line in self.rfile:
+                        if line in (b".\r\n", b".\n"):
+                            break
+                        lines.append(line)
+                    with server.lock:
+                        server.messages.append(email.message_from_bytes(b"".join(lines)))
+                    self.reply("250 queued")
+                elif command.startswith("QUIT"):
+                    self.reply("221 bye")
+                    return
+                else:
+                    self.reply("250 ok")
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def smtp():
+    server = SMTPStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_digests_reuse_one_smtp_connection(smtp):
+    mailer = sa.DigestMailer(host="127.0.0.1", port=smtp.server_address[1])
+    worker = sa.BackgroundWorker("notifications", mailer.send, batch_window=0.2, batch_max=500)
+    for burst in (10, 15, 20, 10):
+        for i in range(burst):
+            worker.submit(("teacher@example.com", f"update {i}"))
+        assert worker.join(timeout=5)
+    mailer.close()
+
+    assert smtp.connections == 1
+    assert mailer.digests_sent == len(smtp.messages) == 4
+    assert [m["Subject"] for m in smtp.messages] == [
+        f"Attendance digest ({n} updates)" for n in (10, 15, 20, 10)]
+    assert worker.metrics()["completed"] == 55
+
+
+def test_reconnects_after_the_server_drops_the_connection(smtp):
+    mailer = sa.DigestMailer(host="127.0.0.1", port=smtp.server_address[1])
+    mailer.send([("teacher@example.com", "first")])
+    smtp.drop_connections()
+    mailer.send([("teacher@example.com", "second")])
+    mailer.close()
+
+    assert smtp.connections == 2
+    assert [m.get_payload().strip() for m in smtp.messages] == ["first", "second"]
+
+
+def test_counters_are_exact_under_concurrent_submits():
+    worker = sa.BackgroundWorker("count", lambda items: None, maxsize=100000, batch_max=1000)
+    threads = [threading.Thread(target=lambda: [worker.submit(i) for i in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert worker.join(timeout=10)
+    metrics = worker.metrics()
+    assert metrics["submitted"] == metrics["completed"] == 16000
+    assert metrics["dropped"] == metrics["failed"] == 0